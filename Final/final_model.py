@@ -1,76 +1,80 @@
+import argparse
+import os
+import sys
 import pandas as pd
-import json
+import numpy as np
 from sklearn.preprocessing import MinMaxScaler
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from catalog_attributes import attach_attributes  # noqa: E402
+from data_store import (  # noqa: E402
+    format_list,
+    load_table,
+    read_forecast,
+    write_parquet,
+)
+from profiling import span  # noqa: E402
+from sentiment_summary import summarize_enriched  # noqa: E402
+from text_match import first_match_index  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Rank products by combined signals")
+parser.add_argument(
+    "--format",
+    type=format_list(["csv", "parquet"]),
+    default=["csv"],
+    help="comma-separated output formats: csv (default) and/or parquet",
+)
+args = parser.parse_args()
+
 # -------------------------------
 # 1. Load all data
 # -------------------------------
-catalog = pd.read_csv("product_catalog.csv")
-sentiment = pd.read_csv("customer_feedback_sentiment_enriched.csv")
+catalog = load_table("product_catalog")
+# Compact per-product sentiment table (one row per productId); built from
+# the review-level file only when the sentiment stage did not emit it.
+if os.path.exists("product_sentiment_summary.csv"):
+    sentiment = pd.read_csv("product_sentiment_summary.csv")
+else:
+    sentiment = summarize_enriched("customer_feedback_sentiment_enriched.csv")
 trend = pd.read_csv("query_growth.csv")
 
-with open("product_demand_forecast.json") as f:
-    product_forecast = json.load(f)
+# Parquet or JSON, whichever the forecast stage wrote last
+_, forecast_df = read_forecast("product_demand_forecast")
 
 # -------------------------------
 # 2. Preprocess product metadata
 # -------------------------------
-season_keywords = ["summer", "winter", "fall", "spring"]
-color_keywords = [
-    "black",
-    "white",
-    "navy",
-    "red",
-    "blue",
-    "green",
-    "yellow",
-    "pink",
-    "beige",
-    "gray",
-]
-
-
-def extract_modifier(text, keywords):
-    text = str(text).lower()
-    for word in keywords:
-        if word in text:
-            return word
-    return "unknown"
-
-
-catalog["season"] = catalog["modifiers"].apply(
-    lambda x: extract_modifier(x, season_keywords)
-)
-catalog["color"] = catalog["modifiers"].apply(
-    lambda x: extract_modifier(x, color_keywords)
-)
+with span("attach_attributes", rows=len(catalog)):
+    catalog = attach_attributes(catalog)
 
 
 # -------------------------------
 # 3. Match trend to title
 # -------------------------------
-def map_trend(title):
-    title = str(title).lower()
-    for _, row in trend.iterrows():
-        if row["query"].lower() in title:
-            return row["growthRate"]
-    return 0
+# The first query (in query_growth.csv order) contained in the title wins;
+# all queries are matched in a single automaton pass per distinct title.
+def map_trend(titles):
+    queries = trend["query"].dropna()
+    if queries.empty:  # no trend rows: no growth to attach
+        return np.zeros(len(titles))
+    growth = trend.loc[queries.index, "growthRate"].to_numpy()
+    match = first_match_index(titles.astype(str).str.lower(), queries.str.lower())
+    return np.where(match >= 0, growth[match], 0)
 
 
-catalog["trend_growth_rate"] = catalog["title"].apply(map_trend)
+with span("map_trend", rows=len(catalog)):
+    catalog["trend_growth_rate"] = map_trend(catalog["title"])
 
 # -------------------------------
 # 4. Merge other signals
 # -------------------------------
-forecast_df = pd.DataFrame(product_forecast["forecast"])
-sentiment["sentiment_score"] = sentiment["final_sentiment"].map(
-    {"positive": 1, "neutral": 0.5, "negative": 0}
-)
 catalog = catalog.merge(
-    sentiment[["productId", "sentiment_score"]], on="productId", how="left"
+    forecast_df[["productId", "forecastedQuantity"]], on="productId", how="left"
 )
 catalog = catalog.merge(
-    sentiment[["productId", "final_sentiment"]], on="productId", how="left"
+    sentiment[["productId", "sentiment_score", "final_sentiment"]],
+    on="productId",
+    how="left",
 )
 
 # -------------------------------
@@ -78,7 +82,7 @@ catalog = catalog.merge(
 # -------------------------------
 scaler = MinMaxScaler()
 catalog[["norm_forecast", "norm_sentiment", "norm_trend"]] = scaler.fit_transform(
-    catalog[["forecastedQuantity", "final_sentiment", "trend_growth_rate"]].fillna(0)
+    catalog[["forecastedQuantity", "sentiment_score", "trend_growth_rate"]].fillna(0)
 )
 
 catalog["rank_score"] = (
@@ -104,5 +108,13 @@ final_df = catalog[
     ]
 ].sort_values(by="rank_score", ascending=False)
 
-final_df.to_csv("final_product_insights.csv", index=False)
-print("✅ final_product_insights.csv generated")
+paths = []
+with span("write_output", rows=len(final_df)):
+    if "csv" in args.format:
+        tmp_path = f"final_product_insights.csv.{os.getpid()}.tmp"
+        final_df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, "final_product_insights.csv")
+        paths.append("final_product_insights.csv")
+    if "parquet" in args.format:
+        paths.append(write_parquet(final_df, "final_product_insights.parquet"))
+print(f"✅ {', '.join(paths)} generated")
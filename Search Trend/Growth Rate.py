@@ -1,25 +1,11 @@
-import pandas as pd
-import re
+import argparse
+import os
+import sys
 
-# -------------------------------------
-# Load the original file
-# -------------------------------------
-df = pd.read_csv("search_trends.csv")
-
-
-# -------------------------------------
-# Clean and normalize the queries
-# -------------------------------------
-def clean_query(text):
-    text = str(text).lower()
-    text = re.sub(r"[^\w\s]", "", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
-
-
-df["query"] = df["query"].apply(clean_query)
-df["timestamp"] = pd.to_datetime(df["timestamp"])
-df["frequency"] = df["frequency"].astype(int)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from profiling import span  # noqa: E402
+from query_categories import categorize_queries  # noqa: E402
+from trend_growth import growth_frame, update_cube  # noqa: E402
 
 # -------------------------------------
 # Define periods
@@ -29,172 +15,37 @@ period_end = "2025-03-31"
 previous_period_start = "2024-03-01"
 previous_period_end = "2024-03-31"
 
-# -------------------------------------
-# Filter data for each period
-# -------------------------------------
-df_current = df[(df["timestamp"] >= period_start) & (df["timestamp"] <= period_end)]
-df_previous = df[
-    (df["timestamp"] >= previous_period_start)
-    & (df["timestamp"] <= previous_period_end)
-]
-
-# -------------------------------------
-# Aggregate frequency and capture timestamps
-# -------------------------------------
-current_agg = (
-    df_current.groupby("query")
-    .agg(
-        frequency_current=("frequency", "sum"),
-        timestamp_current=("timestamp", lambda x: x.min()),
-    )
-    .reset_index()
-)
-
-previous_agg = (
-    df_previous.groupby("query")
-    .agg(
-        frequency_previous=("frequency", "sum"),
-        timestamp_previous=("timestamp", lambda x: x.min()),
-    )
-    .reset_index()
+parser = argparse.ArgumentParser(description="Growth of every query between periods")
+parser.add_argument(
+    "--output",
+    default="trend_growth_with_timestamps.csv",
+    help="e.g. query_growth.csv, the file final_model.py reads",
 )
+args = parser.parse_args()
 
 # -------------------------------------
-# Merge and calculate growth rate
+# Aggregate frequency, capture timestamps and calculate growth rate
 # -------------------------------------
-merged = pd.merge(current_agg, previous_agg, on="query", how="outer").fillna(
-    {"frequency_current": 0, "frequency_previous": 0}
-)
-
-merged["growthRate"] = (merged["frequency_current"] - merged["frequency_previous"]) / (
-    merged["frequency_previous"] + 1
-)
-merged["growthRate"] = merged["growthRate"].round(2)
+# Queries seen in either period, as an outer merge of the two period tables,
+# answered from the cleaned daily query cube.
+with span("update_cube"):
+    index = update_cube()
+with span("growth", rows=len(index.queries)):
+    merged = growth_frame(
+        index,
+        (period_start, period_end),
+        (previous_period_start, previous_period_end),
+        how="outer",
+    )
 
 # -------------------------------------
 # Category assignment
 # -------------------------------------
-category_keywords = {
-    "fashion": [
-        "dress",
-        "tank",
-        "top",
-        "shirt",
-        "tshirt",
-        "trench",
-        "coat",
-        "blazer",
-        "jacket",
-        "sweater",
-        "hoodie",
-        "jeans",
-        "denim",
-        "shorts",
-        "skirt",
-        "trousers",
-        "pants",
-        "cargo",
-        "joggers",
-        "legging",
-        "palazzo",
-        "jumpsuit",
-        "romper",
-        "bodysuit",
-        "co-ord",
-        "matching set",
-        "overalls",
-        "bra",
-        "sports bra",
-        "camisole",
-        "corset",
-        "bralette",
-        "kurta",
-        "saree",
-        "lehenga",
-        "salwar",
-        "kaftan",
-        "cape",
-        "shrug",
-    ],
-    "footwear": [
-        "boots",
-        "shoes",
-        "heels",
-        "flats",
-        "sneakers",
-        "sandals",
-        "loafers",
-        "flipflops",
-        "mules",
-        "slippers",
-    ],
-    "accessories": [
-        "necklace",
-        "ring",
-        "earrings",
-        "bracelet",
-        "watch",
-        "belt",
-        "cap",
-        "hat",
-        "sunglasses",
-        "goggles",
-        "scarf",
-        "beanie",
-        "bag",
-        "purse",
-        "wallet",
-        "backpack",
-        "handbag",
-    ],
-    "electronics": [
-        "phone",
-        "charger",
-        "laptop",
-        "usb",
-        "adapter",
-        "tablet",
-        "monitor",
-        "keyboard",
-        "mouse",
-        "earphones",
-        "headphones",
-        "airpods",
-        "earbuds",
-        "speaker",
-        "smartwatch",
-    ],
-    "home": [
-        "curtain",
-        "lamp",
-        "sofa",
-        "blanket",
-        "pillow",
-        "rug",
-        "mattress",
-        "towel",
-        "cushion",
-        "bedsheet",
-        "duvet",
-        "comforter",
-        "quilt",
-        "vase",
-        "mirror",
-    ],
-}
-
-
-def categorize_query(query):
-    for category, keywords in category_keywords.items():
-        if any(word in query for word in keywords):
-            return category
-    return "misc"
-
-
-merged["category"] = merged["query"].apply(categorize_query)
+with span("categorize", rows=len(merged)):
+    merged["category"] = categorize_queries(merged["query"])
 
 # -------------------------------------
 # Export final file
 # -------------------------------------
-merged.to_csv("trend_growth_with_timestamps.csv", index=False)
-print("✅ File exported: trend_growth_with_timestamps.csv")
+merged.to_csv(args.output, index=False)
+print(f"✅ File exported: {args.output}")
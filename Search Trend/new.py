@@ -1,42 +1,180 @@
+import argparse
+import os
+import sys
+import numpy as np
 import pandas as pd
 
-# Load files
-raw = pd.read_csv("search_trends.csv")
-summary = pd.read_csv("all_trending_keywords_categorized.csv")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data_store import CSV_CHUNKSIZE, iter_table  # noqa: E402
+from profiling import span  # noqa: E402
+from query_categories import clean_queries  # noqa: E402
 
+COMBINED_PATH = "combined_trend_data.csv"
+FACTS_PATH = "trend_facts.csv"
+QUERIES_PATH = "trend_queries.csv"
 
-# Clean raw queries
-def clean_query(q):
-    import re
 
-    q = str(q).lower()
-    q = re.sub(r"[^\w\s]", "", q)
-    return re.sub(r"\s+", " ", q).strip()
+# -----------------------------------
+# Query Dictionary
+# -----------------------------------
+# Integer ids for cleaned queries: summary terms take ids 0..S-1 in summary
+# order, and queries first seen in the log are appended as chunks arrive, so
+# every row is joined to the summary by id rather than by string. Each chunk
+# is factorized first, so only its distinct queries touch the term -> id
+# dict and the per-chunk cost does not grow with the dictionary.
+class QueryIds:
+    def __init__(self, summary_terms):
+        self.terms = list(summary_terms)
+        self.ids = {term: i for i, term in enumerate(self.terms)}
+        self.summary_size = len(self.terms)
 
+    def encode(self, queries):
+        codes, uniques = pd.factorize(queries, use_na_sentinel=False)
+        unique_ids = np.empty(len(uniques), dtype=np.int64)
+        for i, term in enumerate(uniques):
+            if term != term:
+                term = None  # one id for missing queries (NaN != NaN as a key)
+            term_id = self.ids.get(term)
+            if term_id is None:
+                term_id = self.ids[term] = len(self.terms)
+                self.terms.append(term)
+            unique_ids[i] = term_id
+        return unique_ids[codes]
 
-raw["query"] = raw["query"].apply(clean_query)
-summary["searchTerm"] = summary["searchTerm"].apply(clean_query)
 
-# Merge for daily entries
-daily = raw.merge(
-    summary[["searchTerm", "growthRate", "category"]],
-    left_on="query",
-    right_on="searchTerm",
-    how="left",
-)
+def load_summary(path="all_trending_keywords_categorized.csv"):
+    summary = pd.read_csv(path)
+    summary["searchTerm"] = clean_queries(summary["searchTerm"])
+    # One row per term so the id join cannot duplicate log rows; the summary
+    # comes from a groupby on cleaned queries, so this is a no-op in practice.
+    return summary.drop_duplicates("searchTerm").reset_index(drop=True)
 
-daily = daily.drop(columns=["searchTerm"])
-daily["periodType"] = "daily"
 
-# Prepare summary entries (no timestamp)
-summary_rows = summary.copy()
-summary_rows["timestamp"] = pd.NaT
-summary_rows["frequency"] = pd.NA
-summary_rows["periodType"] = "summary"
-summary_rows = summary_rows.rename(columns={"searchTerm": "query"})
+# Yields (query ids, cleaned queries, chunk) for the log, chunk by chunk.
+def encoded_log(ids, chunksize):
+    for chunk in iter_table(
+        "search_trends",
+        columns=["query", "timestamp", "frequency"],
+        chunksize=chunksize,
+    ):
+        with span("clean_queries", rows=len(chunk), aggregate=True):
+            queries = clean_queries(chunk["query"]).to_numpy(dtype=object)
+        yield ids.encode(queries), queries, chunk
 
-# Combine
-combined = pd.concat([daily, summary_rows], ignore_index=True)
-combined.to_csv("combined_trend_data.csv", index=False)
 
-print("✅ Exported: combined_trend_data.csv")
+def take_summary(values, ids, summary_size):
+    in_summary = ids < summary_size
+    return pd.Series(values.take(np.where(in_summary, ids, 0))).where(in_summary)
+
+
+# -----------------------------------
+# Denormalized Layout
+# -----------------------------------
+# combined_trend_data.csv: every log row with its summary growthRate/category
+# ("daily"), followed by the summary rows themselves ("summary"), written
+# chunk by chunk.
+def write_combined(summary, chunksize, path=COMBINED_PATH):
+    ids = QueryIds(summary["searchTerm"])
+    growth = summary["growthRate"].to_numpy()
+    category = summary["category"].to_numpy(dtype=object)
+
+    tmp_path = path + ".tmp"
+    first = True
+    for query_ids, queries, chunk in encoded_log(ids, chunksize):
+        daily = pd.DataFrame(
+            {
+                "query": queries,
+                "timestamp": chunk["timestamp"].to_numpy(),
+                "frequency": chunk["frequency"].to_numpy(),
+                "growthRate": take_summary(growth, query_ids, ids.summary_size),
+                "category": take_summary(category, query_ids, ids.summary_size),
+                "periodType": "daily",
+            }
+        )
+        daily.to_csv(tmp_path, mode="w" if first else "a", header=first, index=False)
+        first = False
+
+    # Summary entries (no timestamp)
+    pd.DataFrame(
+        {
+            "query": summary["searchTerm"],
+            "timestamp": pd.NaT,
+            "frequency": pd.NA,
+            "growthRate": summary["growthRate"],
+            "category": summary["category"],
+            "periodType": "summary",
+        }
+    ).to_csv(tmp_path, mode="w" if first else "a", header=first, index=False)
+    os.replace(tmp_path, path)
+    return [path]
+
+
+# -----------------------------------
+# Normalized Layout
+# -----------------------------------
+# trend_facts.csv (query_id, timestamp, frequency) per log row, and
+# trend_queries.csv with one row per query id holding the query string and
+# its summary growthRate/category (empty for queries not in the summary).
+def write_normalized(
+    summary, chunksize, facts_path=FACTS_PATH, queries_path=QUERIES_PATH
+):
+    ids = QueryIds(summary["searchTerm"])
+
+    tmp_path = facts_path + ".tmp"
+    first = True
+    for query_ids, _, chunk in encoded_log(ids, chunksize):
+        pd.DataFrame(
+            {
+                "query_id": query_ids.astype(np.int32),
+                "timestamp": chunk["timestamp"].to_numpy(),
+                "frequency": chunk["frequency"].to_numpy(),
+            }
+        ).to_csv(tmp_path, mode="w" if first else "a", header=first, index=False)
+        first = False
+    if first:  # empty log
+        pd.DataFrame(columns=["query_id", "timestamp", "frequency"]).to_csv(
+            tmp_path, index=False
+        )
+    os.replace(tmp_path, facts_path)
+
+    all_ids = np.arange(len(ids.terms))
+    pd.DataFrame(
+        {
+            "query_id": all_ids,
+            "query": np.asarray(ids.terms, dtype=object),
+            "growthRate": take_summary(
+                summary["growthRate"].to_numpy(), all_ids, ids.summary_size
+            ),
+            "category": take_summary(
+                summary["category"].to_numpy(dtype=object), all_ids, ids.summary_size
+            ),
+        }
+    ).to_csv(queries_path, index=False)
+    return [facts_path, queries_path]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Combine daily search rows with the trend summary"
+    )
+    parser.add_argument(
+        "--layout",
+        choices=["combined", "normalized"],
+        default="combined",
+        help="one denormalized CSV, or a facts table plus a query dimension",
+    )
+    parser.add_argument("--chunksize", type=int, default=CSV_CHUNKSIZE)
+    args = parser.parse_args()
+
+    summary = load_summary()
+    with span("write_" + args.layout):
+        if args.layout == "normalized":
+            paths = write_normalized(summary, args.chunksize)
+        else:
+            paths = write_combined(summary, args.chunksize)
+    clean_queries.save()
+    print(f"✅ Exported: {', '.join(paths)}")
+
+
+if __name__ == "__main__":
+    main()
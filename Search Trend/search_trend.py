@@ -1,7 +1,18 @@
+import argparse
+import os
+import sys
 import pandas as pd
-import re
 import json
-from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from profiling import span  # noqa: E402
+from query_categories import categorize_queries  # noqa: E402
+from trend_growth import (  # noqa: E402
+    comparison_window,
+    growth_frame,
+    update_cube,
+)
+from trend_sketch import streaming_top_growth  # noqa: E402
 
 # -----------------------------------
 # Configurable Time Periods
@@ -11,191 +22,101 @@ period_end = "2025-03-31"
 previous_period_start = "2024-03-01"
 previous_period_end = "2024-03-31"
 
-# -----------------------------------
-# Load and Clean Data
-# -----------------------------------
-df = pd.read_csv("search_trends.csv")
-
-
-def clean_query(text):
-    text = str(text).lower()
-    text = re.sub(r"[^\w\s]", "", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
-
-
-df["query"] = df["query"].apply(clean_query)
-df["timestamp"] = pd.to_datetime(df["timestamp"])
-df["frequency"] = df["frequency"].astype(int)
-
-# -----------------------------------
-# Filter Periods
-# -----------------------------------
-df_current = df[(df["timestamp"] >= period_start) & (df["timestamp"] <= period_end)]
-df_previous = df[
-    (df["timestamp"] >= previous_period_start)
-    & (df["timestamp"] <= previous_period_end)
-]
-
-# -----------------------------------
-# Aggregate Frequencies
-# -----------------------------------
-current_freq = df_current.groupby("query")["frequency"].sum()
-previous_freq = df_previous.groupby("query")["frequency"].sum()
-
-# -----------------------------------
-# Compute Growth
-# -----------------------------------
-growth_list = []
-for query in current_freq.index:
-    cur = current_freq.get(query, 0)
-    prev = previous_freq.get(query, 0)
-    growth = ((cur - prev) / (prev + 1)) * 100
-    growth_list.append({"searchTerm": query, "growthRate": round(growth, 2)})
-
-df_growth = pd.DataFrame(growth_list).sort_values(by="growthRate", ascending=False)
-top_10 = df_growth.head(10)
-
-# -----------------------------------
-# Categorization Logic
-# -----------------------------------
-category_keywords = {
-    "fashion": [
-        "dress",
-        "tank",
-        "top",
-        "shirt",
-        "tshirt",
-        "trench",
-        "coat",
-        "blazer",
-        "jacket",
-        "sweater",
-        "hoodie",
-        "jeans",
-        "denim",
-        "shorts",
-        "skirt",
-        "trousers",
-        "pants",
-        "cargo",
-        "joggers",
-        "legging",
-        "palazzo",
-        "jumpsuit",
-        "romper",
-        "bodysuit",
-        "co-ord",
-        "matching set",
-        "overalls",
-        "bra",
-        "sports bra",
-        "camisole",
-        "corset",
-        "bralette",
-        "kurta",
-        "saree",
-        "lehenga",
-        "salwar",
-        "kaftan",
-        "cape",
-        "shrug",
-    ],
-    "footwear": [
-        "boots",
-        "shoes",
-        "heels",
-        "flats",
-        "sneakers",
-        "sandals",
-        "loafers",
-        "flipflops",
-        "mules",
-        "slippers",
-    ],
-    "accessories": [
-        "necklace",
-        "ring",
-        "earrings",
-        "bracelet",
-        "watch",
-        "belt",
-        "cap",
-        "hat",
-        "sunglasses",
-        "goggles",
-        "scarf",
-        "beanie",
-        "bag",
-        "purse",
-        "wallet",
-        "backpack",
-        "handbag",
-    ],
-    "electronics": [
-        "phone",
-        "charger",
-        "laptop",
-        "usb",
-        "adapter",
-        "tablet",
-        "monitor",
-        "keyboard",
-        "mouse",
-        "earphones",
-        "headphones",
-        "airpods",
-        "earbuds",
-        "speaker",
-        "smartwatch",
-    ],
-    "home": [
-        "curtain",
-        "lamp",
-        "sofa",
-        "blanket",
-        "pillow",
-        "rug",
-        "mattress",
-        "towel",
-        "cushion",
-        "bedsheet",
-        "duvet",
-        "comforter",
-        "quilt",
-        "vase",
-        "mirror",
-    ],
+parser = argparse.ArgumentParser(description="Rank search terms by period growth")
+parser.add_argument(
+    "--windows",
+    default="",
+    help="extra comma-separated comparisons ending at --as-of: wow, mom, yoy",
+)
+parser.add_argument("--as-of", default=period_end)
+parser.add_argument("--top-n", type=int, default=10)
+parser.add_argument(
+    "--sketch",
+    action="store_true",
+    help="approximate top-N in one bounded-memory pass over the raw log",
+)
+parser.add_argument(
+    "--sketch-capacity", type=int, default=10_000, help="heavy hitters kept per period"
+)
+parser.add_argument(
+    "--sketch-epsilon", type=float, default=1e-4, help="Count-Min error / total"
+)
+parser.add_argument("--sketch-delta", type=float, default=0.01)
+args = parser.parse_args()
+
+# Output suffix -> (current, previous) periods; the configured pair keeps
+# the original file names.
+comparisons = {
+    "": ((period_start, period_end), (previous_period_start, previous_period_end))
 }
-
-
-def categorize_query(query):
-    for category, keywords in category_keywords.items():
-        if any(word in query for word in keywords):
-            return category
-    return "misc"
-
-
-df_growth["category"] = df_growth["searchTerm"].apply(categorize_query)
-top_10["category"] = top_10["searchTerm"].apply(categorize_query)
+for window in filter(None, args.windows.split(",")):
+    comparisons["_" + window] = comparison_window(window, args.as_of)
 
 # -----------------------------------
-# Export Outputs
+# Rank Growth
 # -----------------------------------
-# JSON for top 10
-json_output = {
-    "periodStart": period_start,
-    "periodEnd": period_end,
-    "searchTerms": top_10.to_dict(orient="records"),
-}
-with open("top_trending_keywords.json", "w") as f:
-    json.dump(json_output, f, indent=2)
-
-# CSVs
-df_growth.to_csv("all_trending_keywords_categorized.csv", index=False)
-top_10.to_csv("top_10_trending_keywords_categorized.csv", index=False)
+# Exact mode reads the cleaned per-query daily cube, updated from the log
+# rows added since the last run, and ranks every query. Sketch mode keeps
+# only heavy-hitter and Count-Min summaries per period, so it produces the
+# top N without the all-keywords table.
+if args.sketch:
+    with span("streaming_top_growth"):
+        rankings = streaming_top_growth(
+            comparisons,
+            top_n=args.top_n,
+            capacity=args.sketch_capacity,
+            epsilon=args.sketch_epsilon,
+            delta=args.sketch_delta,
+        )
+    for suffix, (_, bounds) in rankings.items():
+        print(f"ℹ️ Sketch overcount bounds{suffix}: {bounds}")
+else:
+    with span("update_cube") as info:
+        index = update_cube()
+        info["rows"] = len(index.day)
+
+exported = []
+for suffix, (current, previous) in comparisons.items():
+    if args.sketch:
+        df_growth = rankings[suffix][0]
+    else:
+        with span("growth" + suffix, rows=len(index.queries)):
+            growth = growth_frame(index, current, previous, how="current", scale=100)
+            df_growth = (
+                growth[["query", "growthRate"]]
+                .rename(columns={"query": "searchTerm"})
+                .sort_values(by="growthRate", ascending=False)
+            )
+
+    # -----------------------------------
+    # Categorization Logic
+    # -----------------------------------
+    with span("categorize" + suffix, rows=len(df_growth)):
+        df_growth["category"] = categorize_queries(df_growth["searchTerm"])
+    top_n = df_growth.head(args.top_n)
+
+    # -----------------------------------
+    # Export Outputs
+    # -----------------------------------
+    # JSON for top N
+    json_output = {
+        "periodStart": pd.Timestamp(current[0]).strftime("%Y-%m-%d"),
+        "periodEnd": pd.Timestamp(current[1]).strftime("%Y-%m-%d"),
+        "searchTerms": top_n.to_dict(orient="records"),
+    }
+    json_path = f"top_trending_keywords{suffix}.json"
+    with open(json_path, "w") as f:
+        json.dump(json_output, f, indent=2)
+
+    # CSVs
+    all_path = f"all_trending_keywords_categorized{suffix}.csv"
+    top_path = f"top_{args.top_n}_trending_keywords_categorized{suffix}.csv"
+    top_n.to_csv(top_path, index=False)
+    exported += [json_path, top_path]
+    if not args.sketch:
+        df_growth.to_csv(all_path, index=False)
+        exported.append(all_path)
 
 print("✅ All files exported:")
-print("- top_trending_keywords.json")
-print("- top_10_trending_keywords_categorized.csv")
-print("- all_trending_keywords_categorized.csv")
+for path in exported:
+    print(f"- {path}")
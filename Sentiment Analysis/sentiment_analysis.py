@@ -1,93 +1,244 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+import numpy as np
 import pandas as pd
-import re
 import nltk
 from textblob import TextBlob
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
 
-# Downloads (only needed once)
-nltk.download("vader_lexicon")
-nltk.download("punkt")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data_store import iter_table, load_table  # noqa: E402
+from profiling import span  # noqa: E402
+from sentiment_cache import SentimentCache  # noqa: E402
+from sentiment_summary import (  # noqa: E402
+    combine_partials,
+    finalize_summary,
+    partial_summary,
+)
 
-# -------------------------------
-# Load Dataset
-# -------------------------------
-df = pd.read_csv("customer_feedback.csv")
-df.dropna(subset=["commentText"], inplace=True)
-df["commentText"] = df["commentText"].astype(str)
+ENRICHED_PATH = "customer_feedback_sentiment_enriched.csv"
+SUMMARY_PATH = "product_sentiment_summary.csv"
 
 
 # -------------------------------
 # Text Normalization
 # -------------------------------
-def normalize_text(text):
-    text = text.lower()
-    text = re.sub(r"http\S+|www\S+|https\S+", "", text)  # Remove URLs
-    text = re.sub(r"\d+", "", text)  # Remove numbers
-    text = re.sub(r"[^\w\s]", "", text)  # Remove punctuation
-    text = re.sub(r"\s+", " ", text).strip()  # Collapse whitespace
-    text = re.sub(r"(.)\1{2,}", r"\1\1", text)  # Reduce letter spam (e.g., goooood)
-    return text
-
+# Same steps as the per-row regex pipeline, applied column-wide. Object dtype
+# keeps Python `re` semantics (the letter-spam backreference in particular)
+# even where pandas would default to Arrow-backed strings.
+def normalize_texts(texts):
+    return (
+        texts.astype(object)
+        .str.lower()
+        .str.replace(r"http\S+|www\S+|https\S+", "", regex=True)  # Remove URLs
+        .str.replace(r"\d+", "", regex=True)  # Remove numbers
+        .str.replace(r"[^\w\s]", "", regex=True)  # Remove punctuation
+        .str.replace(r"\s+", " ", regex=True)  # Collapse whitespace
+        .str.strip()
+        .str.replace(r"(.)\1{2,}", r"\1\1", regex=True)  # Reduce letter spam
+    )
 
-df["cleaned_text"] = df["commentText"].apply(normalize_text)
 
 # -------------------------------
 # Sentiment Scoring
 # -------------------------------
-vader = SentimentIntensityAnalyzer()
-
-
-def score_textblob(text):
-    return TextBlob(text).sentiment.polarity  # Range [-1.0, 1.0]
-
-
-def score_vader(text):
-    return vader.polarity_scores(text)["compound"]  # Range [-1.0, 1.0]
-
-
-df["sentiment_textblob"] = df["cleaned_text"].apply(score_textblob)
-df["sentiment_vader"] = df["cleaned_text"].apply(score_vader)
+vader = None
+
+
+def score_chunk(texts):
+    global vader
+    if vader is None:  # one analyzer per worker process
+        vader = SentimentIntensityAnalyzer()
+    textblob = [TextBlob(text).sentiment.polarity for text in texts]  # [-1, 1]
+    compound = [vader.polarity_scores(text)["compound"] for text in texts]  # [-1, 1]
+    return np.array(textblob), np.array(compound)
+
+
+# Scores texts in fixed-size chunks, fanned out over a process pool when
+# workers > 1; chunk results come back in input order. A caller scoring many
+# batches passes its own `executor` so the pool is started once.
+def score_texts(texts, workers=1, chunksize=10_000, executor=None):
+    texts = list(texts)
+    chunks = [texts[i : i + chunksize] for i in range(0, len(texts), chunksize)]
+    if executor is not None and len(chunks) > 1:
+        results = list(executor.map(score_chunk, chunks))
+    elif workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(score_chunk, chunks))
+    else:
+        results = [score_chunk(chunk) for chunk in chunks]
+    if not results:
+        return np.array([]), np.array([])
+    return (
+        np.concatenate([textblob for textblob, _ in results]),
+        np.concatenate([compound for _, compound in results]),
+    )
+
+
+# Scores every distinct cleaned text once. With a cache, only texts not
+# scored on an earlier run reach the scorers.
+def score_distinct(texts, workers=1, chunksize=10_000, cache=None, executor=None):
+    codes, uniques = pd.factorize(texts, sort=False)
+    uniques = list(uniques)
+    if cache is None:
+        with span("score_texts", rows=len(uniques), aggregate=True):
+            textblob, compound = score_texts(uniques, workers, chunksize, executor)
+    else:
+        with span("cache_lookup", rows=len(uniques), aggregate=True):
+            textblob, compound, missing = cache.lookup(uniques)
+        if missing.any():
+            new_texts = [text for text, miss in zip(uniques, missing) if miss]
+            with span("score_texts", rows=len(new_texts), aggregate=True):
+                new_textblob, new_compound = score_texts(
+                    new_texts, workers, chunksize, executor
+                )
+            textblob[missing] = new_textblob
+            compound[missing] = new_compound
+            with span("cache_store", rows=len(new_texts), aggregate=True):
+                cache.store(new_texts, new_textblob, new_compound)
+    return textblob[codes], compound[codes]
 
 
 # -------------------------------
 # Rule-Based Sentiment Labeling with Rating Awareness
 # -------------------------------
-def classify_sentiment(row):
-    rating = row["rating"]
-    vader_score = row["sentiment_vader"]
-
-    if pd.notnull(rating):
-        if rating <= 2:
-            return "negative"
-        elif rating == 3:
-            if vader_score >= 0.5:
-                return "positive"
-            elif vader_score <= -0.5:
-                return "negative"
-            else:
-                return "neutral"
-        elif rating >= 4:
-            if vader_score <= -0.4:
-                return "negative"
-            elif vader_score >= 0.4:
-                return "positive"
-            else:
-                return "neutral"
-    else:
-        if vader_score >= 0.4:
-            return "positive"
-        elif vader_score <= -0.4:
-            return "negative"
-        else:
-            return "neutral"
-
+# Ratings strictly between 2 and 3 or between 3 and 4 fall through every
+# rule and stay unlabeled, as in the original row-wise classifier.
+def classify_sentiment(rating, vader_score):
+    rating = np.asarray(rating, dtype=float)
+    vader_score = np.asarray(vader_score, dtype=float)
+    rated = ~np.isnan(rating)
+    return np.select(
+        [
+            rated & (rating <= 2),
+            rated & (rating == 3) & (vader_score >= 0.5),
+            rated & (rating == 3) & (vader_score <= -0.5),
+            rated & (rating == 3),
+            rated & (rating >= 4) & (vader_score <= -0.4),
+            rated & (rating >= 4) & (vader_score >= 0.4),
+            rated & (rating >= 4),
+            ~rated & (vader_score >= 0.4),
+            ~rated & (vader_score <= -0.4),
+            ~rated,
+        ],
+        [
+            "negative",
+            "positive",
+            "negative",
+            "neutral",
+            "negative",
+            "positive",
+            "neutral",
+            "positive",
+            "negative",
+            "neutral",
+        ],
+        default=None,
+    )
 
-df["final_sentiment"] = df.apply(classify_sentiment, axis=1)
 
 # -------------------------------
-# Optional: Export
+# Enrichment
 # -------------------------------
-df.to_csv("customer_feedback_sentiment_enriched.csv", index=False)
-print(
-    "✅ Sentiment analysis complete. Output saved to 'customer_feedback_sentiment_enriched.csv'"
-)
+def enrich(df, args, cache=None, executor=None):
+    df = df.dropna(subset=["commentText"]).copy()
+    df["commentText"] = df["commentText"].astype(str)
+    with span("normalize_texts", rows=len(df), aggregate=True):
+        df["cleaned_text"] = normalize_texts(df["commentText"])
+    with span("score_distinct", rows=len(df), aggregate=True):
+        df["sentiment_textblob"], df["sentiment_vader"] = score_distinct(
+            df["cleaned_text"], args.workers, args.chunksize, cache, executor
+        )
+    with span("classify_sentiment", rows=len(df), aggregate=True):
+        df["final_sentiment"] = classify_sentiment(df["rating"], df["sentiment_vader"])
+    return df
+
+
+# Reads feedback `stream_rows` rows at a time, appends each enriched chunk to
+# the output and folds it into the per-product totals, so memory stays flat
+# in the size of the feedback history. One process pool serves every chunk.
+def enrich_streaming(args, cache=None):
+    totals = pd.DataFrame()
+    tmp_path = ENRICHED_PATH + ".tmp"
+    first = True
+    with ExitStack() as stack:
+        executor = None
+        if args.workers > 1:
+            executor = stack.enter_context(
+                ProcessPoolExecutor(max_workers=args.workers)
+            )
+        for chunk in iter_table("customer_feedback", chunksize=args.stream_rows):
+            chunk = enrich(chunk, args, cache, executor)
+            chunk.to_csv(
+                tmp_path, mode="w" if first else "a", header=first, index=False
+            )
+            totals = combine_partials([totals, partial_summary(chunk)])
+            first = False
+    if first:  # empty input
+        pd.DataFrame().to_csv(tmp_path, index=False)
+    os.replace(tmp_path, ENRICHED_PATH)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score customer feedback sentiment")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="score chunks across N processes"
+    )
+    parser.add_argument("--chunksize", type=int, default=10_000)
+    parser.add_argument(
+        "--cache",
+        default="sentiment_cache.sqlite",
+        help="SQLite score cache keyed by cleaned-text hash",
+    )
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument(
+        "--cache-size", type=int, default=5_000_000, help="max cached texts (LRU)"
+    )
+    parser.add_argument(
+        "--stream-rows",
+        type=int,
+        default=0,
+        help="stream feedback in chunks of N rows with bounded memory (0: load all)",
+    )
+    args = parser.parse_args()
+
+    # Downloads (only needed once)
+    nltk.download("vader_lexicon")
+    nltk.download("punkt")
+
+    cache = None if args.no_cache else SentimentCache(args.cache, args.cache_size)
+    if args.stream_rows > 0:
+        with span("enrich_streaming"):
+            totals = enrich_streaming(args, cache)
+    else:
+        # -------------------------------
+        # Load Dataset
+        # -------------------------------
+        with span("load_feedback") as info:
+            df = load_table("customer_feedback")
+            info["rows"] = len(df)
+        with span("enrich", rows=len(df)):
+            df = enrich(df, args, cache)
+
+        # -------------------------------
+        # Optional: Export
+        # -------------------------------
+        with span("write_enriched", rows=len(df)):
+            df.to_csv(ENRICHED_PATH, index=False)
+        totals = partial_summary(df)
+    if cache is not None:
+        cache.close()
+        print(f"✅ Sentiment cache: {cache.stats()}")
+
+    finalize_summary(totals).to_csv(SUMMARY_PATH, index=False)
+    print(
+        f"✅ Sentiment analysis complete. Output saved to '{ENRICHED_PATH}' and '{SUMMARY_PATH}'"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import hashlib
+import sqlite3
+
+import numpy as np
+
+# Bump when the scorers or their settings change so old scores are not reused.
+SCORER_VERSION = "textblob+vader-1"
+
+
+def text_key(text):
+    return hashlib.blake2b(
+        (SCORER_VERSION + "\0" + text).encode("utf-8"), digest_size=16
+    ).digest()
+
+
+# -------------------------------
+# Persistent Score Cache
+# -------------------------------
+# SQLite table of TextBlob/VADER scores keyed by a hash of the cleaned text.
+# Every lookup batch advances a tick; hits are stamped with it, and whenever
+# a stored batch takes the table past `max_entries` the least recently used
+# rows are evicted, so the file stays bounded even if close() never runs.
+class SentimentCache:
+    def __init__(self, path, max_entries=5_000_000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS scores (
+                key BLOB PRIMARY KEY,
+                textblob REAL NOT NULL,
+                vader REAL NOT NULL,
+                used INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS scores_used ON scores (used);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER);
+            CREATE TEMP TABLE lookup (pos INTEGER PRIMARY KEY, key BLOB NOT NULL);
+            """)
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'tick'").fetchone()
+        self.tick = row[0] if row else 0
+        (self.count,) = self.db.execute("SELECT COUNT(*) FROM scores").fetchone()
+        self.evict()
+
+    # Returns (textblob, vader, missing) arrays aligned with `texts`; missing
+    # entries hold NaN.
+    def lookup(self, texts):
+        self.tick += 1
+        keys = [text_key(text) for text in texts]
+        textblob = np.full(len(keys), np.nan)
+        vader = np.full(len(keys), np.nan)
+
+        with self.db:
+            self.db.execute("DELETE FROM lookup")
+            self.db.executemany(
+                "INSERT INTO lookup (pos, key) VALUES (?, ?)", enumerate(keys)
+            )
+            rows = self.db.execute(
+                "SELECT lookup.pos, scores.textblob, scores.vader "
+                "FROM lookup JOIN scores ON scores.key = lookup.key"
+            ).fetchall()
+            self.db.execute(
+                "UPDATE scores SET used = ? WHERE key IN (SELECT key FROM lookup)",
+                (self.tick,),
+            )
+
+        if rows:
+            pos, blob_scores, vader_scores = map(np.array, zip(*rows))
+            textblob[pos] = blob_scores
+            vader[pos] = vader_scores
+        missing = np.isnan(vader)
+        self.hits += int((~missing).sum())
+        self.misses += int(missing.sum())
+        return textblob, vader, missing
+
+    def store(self, texts, textblob, vader):
+        with self.db:
+            before = self.db.total_changes
+            self.db.executemany(
+                "INSERT OR REPLACE INTO scores (key, textblob, vader, used) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    (text_key(text), float(blob), float(compound), self.tick)
+                    for text, blob, compound in zip(texts, textblob, vader)
+                ),
+            )
+            self.count += self.db.total_changes - before
+        self.evict()
+
+    def evict(self):
+        excess = self.count - self.max_entries
+        if excess > 0:
+            with self.db:
+                self.db.execute(
+                    "DELETE FROM scores WHERE key IN "
+                    "(SELECT key FROM scores ORDER BY used LIMIT ?)",
+                    (excess,),
+                )
+            self.evicted += excess
+            self.count -= excess
+
+    def close(self):
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES ('tick', ?)",
+                (self.tick,),
+            )
+        self.db.close()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evicted": self.evicted,
+        }
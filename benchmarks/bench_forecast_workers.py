@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from forecasting import run_sharded, shard_by_key  # noqa: E402
+from product_demand_forecast import forecast_per_product  # noqa: E402
+from synthetic import make_sales  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark per-product forecasting across worker counts"
+    )
+    parser.add_argument("--catalog", default=os.path.join(ROOT, "product_catalog.csv"))
+    parser.add_argument("--products", type=int, default=None)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    product_ids = pd.read_csv(args.catalog, usecols=["productId"])["productId"]
+    product_ids = product_ids.unique()[: args.products]
+    agg = make_sales(product_ids, args.days)
+    print(f"{len(product_ids)} products, {args.days} days, {len(agg)} sales rows")
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != args.max_workers:
+        worker_counts.append(args.max_workers)
+
+    results = []
+    for workers in worker_counts:
+        n_jobs = 1 if workers > 1 else None
+        start = time.perf_counter()
+        output = run_sharded(
+            forecast_per_product,
+            shard_by_key(agg, "productId", workers),
+            workers,
+            7,
+            n_jobs,
+        )
+        elapsed = time.perf_counter() - start
+        speedup = results[0]["seconds"] / elapsed if results else 1.0
+        results.append(
+            {
+                "workers": workers,
+                "seconds": round(elapsed, 3),
+                "speedup": round(speedup, 2),
+                "series": len(output),
+            }
+        )
+        print(f"workers={workers:>3}  {elapsed:8.2f}s  speedup x{speedup:.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import json
+import glob
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data_store import CACHE_DIR  # noqa: E402
+from pipeline import STAGES, run_pipeline  # noqa: E402
+from synthetic import add_scale_arguments, scale_params, write_dataset  # noqa: E402
+
+# Input table whose rows each stage's throughput is measured against
+STAGE_ROWS = {
+    "product_forecast": "sales_data",
+    "category_forecast": "sales_data",
+    "sentiment": "customer_feedback",
+    "search_trend": "search_trends",
+    "trend_growth": "search_trends",
+    "final": "product_catalog",
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Reuses data_dir when it already holds a dataset generated with the same
+# parameters, so repeated runs time the stages and not the generator.
+def prepare_dataset(data_dir, params):
+    params_path = os.path.join(data_dir, "params.json")
+    if os.path.exists(params_path):
+        with open(params_path) as f:
+            existing = json.load(f)
+        if existing["params"] == params:
+            return existing["rows"], 0.0
+    start = time.perf_counter()
+    rows = write_dataset(data_dir, params)
+    return rows, time.perf_counter() - start
+
+
+# Derived state the stages persist between runs (score cache, query cube,
+# memo tables, attribute index, forecast state, Parquet mirrors); cleared
+# unless --warm so runs start cold.
+def clear_caches(data_dir):
+    for name in [CACHE_DIR, "forecast_state"]:
+        shutil.rmtree(os.path.join(data_dir, name), ignore_errors=True)
+    for pattern in [
+        "sentiment_cache.sqlite*",
+        "search_trends_cube.npz",
+        "*_attributes.pkl",
+        "*.parquet",
+    ]:
+        for path in glob.glob(os.path.join(data_dir, pattern)):
+            os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark every pipeline stage on synthetic data"
+    )
+    add_scale_arguments(parser)
+    parser.add_argument(
+        "--data-dir",
+        default=None,
+        help="where to generate (or reuse) the dataset; default benchmarks/data/<scale>",
+    )
+    parser.add_argument(
+        "stages", nargs="*", help=f"stages to time (plus upstream): {', '.join(STAGES)}"
+    )
+    parser.add_argument(
+        "--warm", action="store_true", help="keep caches from earlier runs"
+    )
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    params = scale_params(
+        args.scale,
+        products=args.products,
+        days=args.days,
+        reviews=args.reviews,
+        queries=args.queries,
+        seed=args.seed,
+    )
+    data_dir = os.path.abspath(
+        args.data_dir or os.path.join(ROOT, "benchmarks", "data", args.scale)
+    )
+    rows, generate_seconds = prepare_dataset(data_dir, params)
+    print(f"Dataset in {data_dir}: {rows}")
+    if not args.warm:
+        clear_caches(data_dir)
+
+    # One stage at a time so timings and peak RSS are not shared
+    with tempfile.TemporaryDirectory() as tmp:
+        profile_path = os.path.join(tmp, "profile.json")
+        status = run_pipeline(
+            args.stages, data_dir, jobs=1, force=True, profile=profile_path
+        )
+        with open(profile_path) as f:
+            profile = json.load(f)["stages"]
+
+    # wall_s is the runner's time for the stage process, imports included;
+    # script_wall_s only covers the script after profiling was imported.
+    stages = {}
+    for name, report in profile.items():
+        input_rows = rows[STAGE_ROWS[name]]
+        stages[name] = {
+            "status": status[name],
+            "input_rows": input_rows,
+            "wall_s": report["wall_s"],
+            "script_wall_s": report.get("script_wall_s"),
+            "cpu_s": report.get("cpu_s"),
+            "peak_rss_mb": report.get("peak_rss_mb"),
+            "rows_per_s": round(input_rows / report["wall_s"], 1),
+            "totals": report.get("totals", {}),
+        }
+        print(
+            f"{name:<18} {report['wall_s']:9.2f}s  "
+            f"{stages[name]['rows_per_s']:>12,.0f} rows/s  "
+            f"peak {report.get('peak_rss_mb')} MB"
+        )
+
+    results = {
+        "scale": args.scale,
+        "params": params,
+        "rows": rows,
+        "generate_s": round(generate_seconds, 2),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "warm": args.warm,
+        "stages": stages,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
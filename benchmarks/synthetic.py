@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalog_attributes import color_keywords, season_keywords  # noqa: E402
+from query_categories import CATEGORY_KEYWORDS  # noqa: E402
+
+# ------------------------
+# Scales
+# ------------------------
+# Benchmark presets by catalog size. Sales cover `sold_share` of the catalog
+# over `days`; reviews and search-log rows grow with the catalog.
+SCALES = {
+    "10k": {"products": 10_000, "reviews": 50_000, "queries": 20_000},
+    "100k": {"products": 100_000, "reviews": 500_000, "queries": 200_000},
+    "1M": {"products": 1_000_000, "reviews": 5_000_000, "queries": 2_000_000},
+}
+DEFAULTS = {
+    "days": 120,
+    "sold_share": 0.3,
+    "search_rows_per_query": 10,
+    "distinct_comments": 50_000,
+    "seed": 0,
+}
+END_DATE = "2025-05-31"
+CHUNK_PRODUCTS = 50_000
+
+STYLES = ["solid", "denim", "sleeveless", "plaid", "floral", "distressed", "cropped"]
+STYLES += ["oversized", "organic", "cashmere", "lowrise", "tailored", "petite"]
+GARMENTS = [word for words in CATEGORY_KEYWORDS.values() for word in words]
+MODIFIERS = STYLES + season_keywords + color_keywords
+OPINIONS = [
+    "Love it, fits perfectly",
+    "Terrible quality, broke in 2 days",
+    "Worst purchase ever",
+    "Okay for the price",
+    "Color faded after one wash!!!",
+    "Sooooo comfy, would buy again",
+    "Not as described, returning it",
+    "Great value, fast delivery",
+    "meh... average at best",
+    "Absolutely stunning, got so many compliments",
+]
+
+
+def product_ids(n):
+    return np.char.add("P", np.arange(1001, 1001 + n).astype(str))
+
+
+# ------------------------
+# Generators
+# ------------------------
+# Each generator is seeded and yields frames chunk by chunk, so 1M-product
+# datasets are written without holding the full table in memory.
+def make_catalog(products, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = product_ids(products)
+    for start in range(0, products, CHUNK_PRODUCTS):
+        n = min(CHUNK_PRODUCTS, products - start)
+        first = np.asarray(MODIFIERS)[rng.integers(len(MODIFIERS), size=n)]
+        second = np.asarray(STYLES)[rng.integers(len(STYLES), size=n)]
+        garment = np.asarray(GARMENTS)[rng.integers(len(GARMENTS), size=n)]
+        title = pd.Series(first + " " + second + " " + garment).str.title()
+        yield pd.DataFrame(
+            {
+                "productId": ids[start : start + n],
+                "title": title,
+                "description": "Synthetic " + title + " for benchmarking.",
+                "category": garment,
+                "modifiers": pd.Series(first) + ", " + second,
+                "keywords": pd.Series(second) + ", " + garment,
+                "releaseDate": pd.Timestamp("2023-01-01")
+                + pd.to_timedelta(rng.integers(0, 730, size=n), unit="D"),
+            }
+        )
+
+
+def make_sales(product_ids, days, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end=END_DATE, periods=days, freq="D")
+    rates = rng.gamma(1.0, 3.0, size=len(product_ids))
+    qty = rng.poisson(rates[:, None], size=(len(product_ids), days))
+    pid_idx, day_idx = np.nonzero(qty)
+    return pd.DataFrame(
+        {
+            "productId": np.asarray(product_ids)[pid_idx],
+            "timestamp": dates[day_idx],
+            "quantitySold": qty[pid_idx, day_idx],
+        }
+    )
+
+
+def iter_sales(products, days, sold_share=0.3, seed=0):
+    rng = np.random.default_rng(seed)
+    sold = product_ids(products)[rng.random(products) < sold_share]
+    for i, start in enumerate(range(0, len(sold), CHUNK_PRODUCTS)):
+        yield make_sales(sold[start : start + CHUNK_PRODUCTS], days, seed + i + 1)
+
+
+# Query strings are 2-4 vocabulary words; about one in ten carries the case
+# and punctuation noise clean_query strips. Rows follow a Zipf-like
+# popularity over queries and span two years so year-over-year windows fill.
+def iter_search_trends(queries, rows_per_query=10, seed=0):
+    rng = np.random.default_rng(seed)
+    vocabulary = np.asarray(MODIFIERS + GARMENTS)
+    words = vocabulary[rng.integers(len(vocabulary), size=(queries, 4))]
+    lengths = rng.integers(2, 5, size=queries)
+    text = pd.Series(
+        [" ".join(row[:n]) for row, n in zip(words, lengths)], dtype=object
+    )
+    noisy = rng.random(queries) < 0.1
+    text[noisy] = text[noisy].str.upper() + "!"
+
+    total = queries * rows_per_query
+    weights = 1.0 / np.arange(1, queries + 1) ** 0.8
+    weights /= weights.sum()
+    days = pd.date_range(end=END_DATE, periods=730, freq="D")
+    for start in range(0, total, 1_000_000):
+        n = min(1_000_000, total - start)
+        yield pd.DataFrame(
+            {
+                "query": text.to_numpy()[rng.choice(queries, size=n, p=weights)],
+                "timestamp": days[rng.integers(len(days), size=n)],
+                "frequency": rng.integers(1, 200, size=n),
+            }
+        )
+
+
+# `distinct_comments` bounds how many different texts appear, which is what
+# the sentiment score cache and distinct-text scoring are sensitive to.
+def iter_feedback(products, reviews, distinct_comments=50_000, seed=0):
+    rng = np.random.default_rng(seed)
+    opinions = np.asarray(OPINIONS)[rng.integers(len(OPINIONS), size=distinct_comments)]
+    comments = np.char.add(
+        opinions, np.char.add(" #", np.arange(distinct_comments).astype(str))
+    )
+    days = pd.date_range(end=END_DATE, periods=540, freq="D")
+    ids = product_ids(products)
+    for start in range(0, reviews, 1_000_000):
+        n = min(1_000_000, reviews - start)
+        rating = rng.integers(1, 6, size=n).astype(float)
+        rating[rng.random(n) < 0.05] = np.nan
+        yield pd.DataFrame(
+            {
+                "productId": ids[rng.integers(products, size=n)],
+                "commentText": comments[rng.integers(distinct_comments, size=n)],
+                "rating": rating,
+                "timestamp": days[rng.integers(len(days), size=n)],
+            }
+        )
+
+
+def write_chunks(chunks, path):
+    rows = 0
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        rows += len(chunk)
+    return rows
+
+
+def scale_params(scale, **overrides):
+    params = {**DEFAULTS, **SCALES[scale]}
+    params.update({key: value for key, value in overrides.items() if value is not None})
+    return params
+
+
+# Writes the four input tables to data_dir and returns their row counts. A
+# params.json next to them lets callers reuse a dataset generated earlier
+# with the same parameters.
+def write_dataset(data_dir, params):
+    os.makedirs(data_dir, exist_ok=True)
+    seed = params["seed"]
+    counts = {
+        "product_catalog": write_chunks(
+            make_catalog(params["products"], seed),
+            os.path.join(data_dir, "product_catalog.csv"),
+        ),
+        "sales_data": write_chunks(
+            iter_sales(params["products"], params["days"], params["sold_share"], seed),
+            os.path.join(data_dir, "sales_data.csv"),
+        ),
+        "search_trends": write_chunks(
+            iter_search_trends(
+                params["queries"], params["search_rows_per_query"], seed
+            ),
+            os.path.join(data_dir, "search_trends.csv"),
+        ),
+        "customer_feedback": write_chunks(
+            iter_feedback(
+                params["products"], params["reviews"], params["distinct_comments"], seed
+            ),
+            os.path.join(data_dir, "customer_feedback.csv"),
+        ),
+    }
+    with open(os.path.join(data_dir, "params.json"), "w") as f:
+        json.dump({"params": params, "rows": counts}, f, indent=2)
+    return counts
+
+
+def add_scale_arguments(parser):
+    parser.add_argument("--scale", choices=list(SCALES), default="10k")
+    for name in ["products", "days", "reviews", "queries", "seed"]:
+        parser.add_argument(f"--{name}", type=int, default=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write seeded synthetic pipeline inputs"
+    )
+    add_scale_arguments(parser)
+    parser.add_argument("--data-dir", required=True)
+    args = parser.parse_args()
+
+    params = scale_params(
+        args.scale,
+        products=args.products,
+        days=args.days,
+        reviews=args.reviews,
+        queries=args.queries,
+        seed=args.seed,
+    )
+    counts = write_dataset(args.data_dir, params)
+    for name, rows in counts.items():
+        print(f"✅ {name}.csv: {rows} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import pickle
+import re
+
+import pandas as pd
+
+from data_store import load_table, source_path
+
+season_keywords = ["summer", "winter", "fall", "spring"]
+color_keywords = [
+    "black",
+    "white",
+    "navy",
+    "red",
+    "blue",
+    "green",
+    "yellow",
+    "pink",
+    "beige",
+    "gray",
+]
+
+
+# ------------------------
+# Modifier Extraction
+# ------------------------
+# One compiled alternation of lookaheads, anchored at the start, tries the
+# keywords in list order, so the captured group is the first keyword of the
+# list contained in the text -- the same result as looping over the keywords
+# with `word in text` -- for the whole column in a single str.extract.
+def extract_modifier(texts, keywords):
+    pattern = "(?s)^(?:%s)" % "|".join(
+        f"(?=.*?({re.escape(word)}))" for word in keywords
+    )
+    groups = texts.astype(str).str.lower().str.extract(pattern)
+    return groups.bfill(axis=1).iloc[:, 0].fillna("unknown")
+
+
+# ------------------------
+# Cached Attribute Index
+# ------------------------
+# season/color per productId, pickled next to the catalog as
+# `<catalog>_attributes.pkl` together with a hash of the catalog file it was
+# built from; it is rebuilt only when that file changes.
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_attribute_index(catalog="product_catalog", data_dir="."):
+    path = source_path(catalog, data_dir)
+    index_path = os.path.splitext(path)[0] + "_attributes.pkl"
+    source_hash = file_digest(path)
+
+    if os.path.exists(index_path):
+        with open(index_path, "rb") as f:
+            cached = pickle.load(f)
+        if cached["source_hash"] == source_hash:
+            return cached["index"]
+
+    modifiers = load_table(
+        catalog, columns=["productId", "modifiers"], data_dir=data_dir
+    )
+    index = pd.DataFrame(
+        {
+            "productId": modifiers["productId"],
+            "season": extract_modifier(modifiers["modifiers"], season_keywords),
+            "color": extract_modifier(modifiers["modifiers"], color_keywords),
+        }
+    ).drop_duplicates("productId")
+
+    # Per-process temp name: concurrent pipeline stages may rebuild it at once.
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(
+            {"source_hash": source_hash, "index": index},
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    os.replace(tmp_path, index_path)
+    return index
+
+
+def attach_attributes(df, catalog="product_catalog", data_dir="."):
+    return df.merge(load_attribute_index(catalog, data_dir), on="productId", how="left")
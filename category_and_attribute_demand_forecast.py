@@ -1,116 +1,244 @@
+import argparse
+import numpy as np
 import pandas as pd
 from xgboost import XGBRegressor
 from datetime import timedelta
-import json
-
-# Load datasets
-sales = pd.read_csv("sales_data.csv")
-catalog = pd.read_csv("product_catalog.csv")
-sales["timestamp"] = pd.to_datetime(sales["timestamp"])
-sales["quantitySold"] = sales["quantitySold"].astype(int)
-
-
-# Extract modifiers
-def extract_modifier(text, keywords):
-    text = str(text).lower()
-    for word in keywords:
-        if word in text:
-            return word
-    return "unknown"
-
-
-season_keywords = ["summer", "winter", "fall", "spring"]
-color_keywords = [
-    "black",
-    "white",
-    "navy",
-    "red",
-    "blue",
-    "green",
-    "yellow",
-    "pink",
-    "beige",
-    "gray",
-]
-
-catalog["season"] = catalog["modifiers"].apply(
-    lambda x: extract_modifier(x, season_keywords)
-)
-catalog["color"] = catalog["modifiers"].apply(
-    lambda x: extract_modifier(x, color_keywords)
-)
 
-# Merge sales + catalog
-merged = pd.merge(
-    sales,
-    catalog[["productId", "category", "season", "color"]],
-    on="productId",
-    how="left",
+from catalog_attributes import attach_attributes
+from data_store import format_list, load_table, read_forecast, write_forecast
+from forecasting import (
+    FEATURES,
+    build_daily_features,
+    last_window,
+    predict_per_series,
+    recursive_forecast,
+    run_sharded,
+    shard_by_key,
 )
+from product_demand_forecast import LEAF_FORECAST
+from profiling import span
 
-# Forecast config
-forecast_start = pd.to_datetime("2025-06-01")
-forecast_days = 30
-forecast_end = forecast_start + timedelta(days=forecast_days - 1)
+GROUP_KEYS = ["category", "season", "color"]
+RECONCILED_FORECAST = "product_reconciled_forecast"
 
-# Forecast loop
-output = []
-grouped = (
-    merged.groupby(["category", "season", "color", "timestamp"])["quantitySold"]
-    .sum()
-    .reset_index()
-)
 
-for key, group in grouped.groupby(["category", "season", "color"]):
-    df = group.rename(columns={"timestamp": "ds", "quantitySold": "y"})
-    df = df.set_index("ds").asfreq("D").fillna(0).reset_index()
-    df["dayofweek"] = df["ds"].dt.dayofweek
-    df["month"] = df["ds"].dt.month
-    df["lag1"] = df["y"].shift(1)
-    df["rolling7"] = df["y"].rolling(7).mean()
-    df.dropna(inplace=True)
-
-    if len(df) < 15:
-        continue
-
-    model = XGBRegressor(n_estimators=20, max_depth=3, verbosity=0)
-    model.fit(df[["dayofweek", "month", "lag1", "rolling7"]], df["y"])
-
-    preds = []
-    last_known = df.iloc[-1].copy()
-    recent = df["y"][-7:].tolist()
-
-    for _ in range(forecast_days):
-        next_day = last_known["ds"] + timedelta(days=1)
-        next_input = {
-            "dayofweek": next_day.dayofweek,
-            "month": next_day.month,
-            "lag1": last_known["y"],
-            "rolling7": sum(recent[-7:]) / len(recent[-7:]),
-        }
-        pred = model.predict(pd.DataFrame([next_input]))[0]
-        pred = max(0, int(pred))
-        preds.append(pred)
-        recent.append(pred)
-        last_known = {"ds": next_day, "y": pred}
+# Load datasets, merge sales + catalog and aggregate per group and day
+def load_grouped():
+    sales = load_table("sales_data", columns=["productId", "timestamp", "quantitySold"])
+    catalog = attach_attributes(
+        load_table("product_catalog", columns=["productId", "category"])
+    )
+    sales["quantitySold"] = sales["quantitySold"].astype(int)
+
+    merged = pd.merge(
+        sales,
+        catalog[["productId", "category", "season", "color"]],
+        on="productId",
+        how="left",
+    )
+
+    return (
+        merged.groupby(GROUP_KEYS + ["timestamp"])["quantitySold"].sum().reset_index()
+    )
+
 
-    output.append(
+# Forecast loop
+def forecast_groups(grouped, forecast_days, n_jobs=None):
+    features = build_daily_features(grouped, GROUP_KEYS)
+
+    models = []
+    for _, df in features.groupby(GROUP_KEYS, sort=False):
+        model = XGBRegressor(n_estimators=20, max_depth=3, verbosity=0, n_jobs=n_jobs)
+        with span("fit_series", rows=len(df), aggregate=True):
+            model.fit(df[FEATURES].to_numpy(dtype=float), df["quantitySold"])
+        models.append(model)
+
+    last, last_dates, history = last_window(features, GROUP_KEYS)
+    preds = recursive_forecast(
+        predict_per_series(models), last_dates, history, forecast_days
+    )
+    return [
         {
-            "category": key[0],
-            "season": key[1],
-            "color": key[2],
-            "forecastedQuantity": int(sum(preds)),
+            "category": category,
+            "season": season,
+            "color": color,
+            "forecastedQuantity": int(total),
         }
+        for (category, season, color), total in zip(
+            last[GROUP_KEYS].itertuples(index=False), preds.sum(axis=1)
+        )
+    ]
+
+
+# ------------------------
+# Hierarchical Forecast
+# ------------------------
+# Product totals over the same 30 days (product_demand_forecast.py
+# --leaf-days 30) are summed into their category/season/color group, so
+# group numbers add up to the product forecasts without a second set of
+# models. Products missing from the catalog have no group and are left out,
+# as in load_grouped. This skips group training but runs every product's
+# recursive forecast for 30 days instead of 7, so on the sample data the total
+# forecast time is about unchanged (13.7s -> 13.6s): the gain is coherent
+# numbers until product predictions are cheap relative to group training.
+def load_leaf_forecast(period):
+    loaded = read_forecast(LEAF_FORECAST)
+    if loaded is None or (loaded[0]["periodStart"], loaded[0]["periodEnd"]) != period:
+        raise SystemExit(
+            f"❌ {LEAF_FORECAST}.parquet missing or not for {period[0]}..{period[1]}; "
+            "run product_demand_forecast.py --leaf-days 30 first"
+        )
+    catalog = attach_attributes(
+        load_table("product_catalog", columns=["productId", "category"])
+    )
+    return loaded[1].merge(
+        catalog[["productId"] + GROUP_KEYS], on="productId", how="left"
     )
 
-# Save output
-forecast_json = {
-    "periodStart": forecast_start.strftime("%Y-%m-%d"),
-    "periodEnd": forecast_end.strftime("%Y-%m-%d"),
-    "forecast": output,
-}
 
-with open("category_and_attribute_demand_forecast.json", "w") as f:
-    json.dump(forecast_json, f, indent=2)
+def bottom_up(leaves):
+    return leaves.groupby(GROUP_KEYS)["forecastedQuantity"].agg(["sum", "size"])
+
+
+# MinT with the WLS-structural weights (each node's variance proportional to
+# the number of products under it). For a group of n products whose forecasts
+# sum to B, with a base group forecast A, every product moves by
+# (A - B) / (2n), so the group total becomes (A + B) / 2. Products are then
+# clipped at 0 and rounded to whole units (largest remainder) so the group
+# total is exactly the sum of its products. A group with no product forecasts
+# keeps A; products without a base group forecast, or without a group, keep
+# their own forecast. Returns the group records and the reconciled products.
+def reconcile_mint(base, leaves):
+    base = pd.DataFrame(base, columns=GROUP_KEYS + ["forecastedQuantity"])
+    base = base.set_index(GROUP_KEYS)["forecastedQuantity"].astype(float)
+    groups = bottom_up(leaves)
+    shift = (
+        (base.reindex(groups.index) - groups["sum"]) / (2 * groups["size"])
+    ).fillna(0.0)
+
+    leaves = leaves.copy()
+    keys = pd.MultiIndex.from_frame(leaves[GROUP_KEYS])
+    adjusted = (
+        leaves["forecastedQuantity"].to_numpy(dtype=float)
+        + shift.reindex(keys, fill_value=0.0).to_numpy()
+    )
+    adjusted = np.maximum(adjusted, 0.0)
+
+    # Whole units per product: floor, then hand the group's remaining units to
+    # the products with the largest fractional parts.
+    units = np.floor(adjusted)
+    leaves["_fraction"] = adjusted - units
+    leaves["_units"] = units
+    group = leaves.groupby(GROUP_KEYS, sort=False, dropna=False)
+    remaining = (group["_fraction"].transform("sum")).round().to_numpy()
+    order = leaves.sort_values("_fraction", ascending=False, kind="stable")
+    rank = order.groupby(GROUP_KEYS, sort=False, dropna=False).cumcount()
+    leaves["forecastedQuantity"] = (
+        units + (rank.reindex(leaves.index).to_numpy() < remaining)
+    ).astype(int)
+    leaves = leaves.drop(columns=["_fraction", "_units"])
+
+    totals = bottom_up(leaves)["sum"].astype(float)
+    totals = totals.combine_first(base[~base.index.isin(totals.index)]).sort_index()
+    return group_records(totals), leaves[["productId", "forecastedQuantity"]]
+
+
+def group_records(totals):
+    return [
+        {
+            "category": category,
+            "season": season,
+            "color": color,
+            "forecastedQuantity": int(total),
+        }
+        for (category, season, color), total in totals.items()
+    ]
 
-print("✅ Saved: category_and_attribute_demand_forecast.json")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Forecast 30-day demand per category, season and color"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="shard category/season/color groups across N processes",
+    )
+    parser.add_argument(
+        "--format",
+        type=format_list(["parquet", "json"]),
+        default=["parquet"],
+        help="comma-separated output formats: parquet (default) and/or json",
+    )
+    parser.add_argument(
+        "--reconcile",
+        choices=["none", "bottom-up", "mint"],
+        default="none",
+        help="none: group models only; bottom-up: sum product forecasts instead "
+        "of training group models; mint: reconcile group models with them",
+    )
+    args = parser.parse_args()
+
+    # Forecast config
+    forecast_start = pd.to_datetime("2025-06-01")
+    forecast_days = 30
+    forecast_end = forecast_start + timedelta(days=forecast_days - 1)
+
+    period = (forecast_start.strftime("%Y-%m-%d"), forecast_end.strftime("%Y-%m-%d"))
+    if args.reconcile != "none":
+        with span("load_leaf_forecast") as info:
+            leaves = load_leaf_forecast(period)
+            info["rows"] = len(leaves)
+
+    if args.reconcile == "bottom-up":
+        with span("bottom_up", rows=len(leaves)):
+            output = group_records(bottom_up(leaves)["sum"])
+    else:
+        with span("load_grouped") as info:
+            grouped = load_grouped()
+            info["rows"] = len(grouped)
+        # Pin XGBoost to one thread per worker process to avoid oversubscription
+        n_jobs = 1 if args.workers > 1 else None
+        with span("forecast", rows=len(grouped)):
+            output = run_sharded(
+                forecast_groups,
+                shard_by_key(grouped, GROUP_KEYS, args.workers),
+                args.workers,
+                forecast_days,
+                n_jobs,
+            )
+        if args.reconcile == "mint":
+            with span("reconcile_mint", rows=len(leaves)):
+                output, products = reconcile_mint(output, leaves)
+            reconciled = {
+                "periodStart": period[0],
+                "periodEnd": period[1],
+                "forecast": products.to_dict("records"),
+            }
+            write_forecast(
+                RECONCILED_FORECAST,
+                reconciled,
+                ["productId", "forecastedQuantity"],
+                args.format,
+            )
+
+    # Save output
+    forecast_json = {
+        "periodStart": period[0],
+        "periodEnd": period[1],
+        "forecast": output,
+    }
+
+    with span("write_output", rows=len(forecast_json["forecast"])):
+        paths = write_forecast(
+            "category_and_attribute_demand_forecast",
+            forecast_json,
+            GROUP_KEYS + ["forecastedQuantity"],
+            args.format,
+        )
+    print(f"✅ Saved: {', '.join(paths)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+import argparse
+import json
+import os
+
+import pandas as pd
+
+# ------------------------
+# Input Schemas
+# ------------------------
+# Every stage reads its inputs through load_table. When `<name>.parquet` is
+# present (and not older than `<name>.csv`) it is read with column projection
+# and timestamp predicate pushdown; otherwise the CSV is parsed with the same
+# types. Run `python data_store.py` in the data directory to convert once.
+TABLES = {
+    "sales_data": {
+        "dates": ["timestamp"],
+        "dtypes": {"quantitySold": "int32"},
+        "dictionary": ["productId"],
+        "sort": "timestamp",
+    },
+    "search_trends": {
+        "dates": ["timestamp"],
+        "dtypes": {"frequency": "int32"},
+        "dictionary": ["query"],
+        "sort": "timestamp",
+    },
+    "customer_feedback": {
+        "dates": ["timestamp"],
+        "dtypes": {"rating": "float32"},
+        "dictionary": ["productId"],
+    },
+    "product_catalog": {
+        "dates": ["releaseDate"],
+        "dtypes": {},
+        "dictionary": ["productId", "category"],
+    },
+}
+
+# Derived artifacts (compiled matchers, attribute indexes, memo tables)
+CACHE_DIR = os.environ.get("PIPELINE_CACHE_DIR", ".pipeline_cache")
+
+DEFAULT_SCHEMA = {"dates": [], "dtypes": {}, "dictionary": []}
+
+ROW_GROUP_SIZE = 256_000
+CSV_CHUNKSIZE = 1_000_000
+
+
+def table_paths(name, data_dir="."):
+    stem = os.path.splitext(name)[0] if name.endswith((".csv", ".parquet")) else name
+    stem = os.path.join(data_dir, stem)
+    return stem + ".csv", stem + ".parquet"
+
+
+def schema_for(name):
+    stem = os.path.basename(table_paths(name)[0])[: -len(".csv")]
+    return TABLES.get(stem, DEFAULT_SCHEMA)
+
+
+def apply_types(df, schema):
+    for column in schema["dates"]:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column])
+    for column, dtype in schema["dtypes"].items():
+        if column in df.columns:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+# ------------------------
+# Conversion
+# ------------------------
+def convert_table(name, data_dir="."):
+    csv_path, parquet_path = table_paths(name, data_dir)
+    schema = schema_for(name)
+    df = apply_types(pd.read_csv(csv_path), schema)
+
+    # Event tables are sorted by timestamp so row-group statistics let date
+    # filters skip whole row groups.
+    if schema.get("sort") in df.columns:
+        df = df.sort_values(schema["sort"], kind="stable")
+
+    tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+    df.to_parquet(
+        tmp_path,
+        engine="pyarrow",
+        index=False,
+        row_group_size=ROW_GROUP_SIZE,
+        use_dictionary=[c for c in schema["dictionary"] if c in df.columns],
+        compression="zstd",
+    )
+    os.replace(tmp_path, parquet_path)
+    return parquet_path
+
+
+# ------------------------
+# Reading
+# ------------------------
+# The file load_table reads: the Parquet copy when it is at least as new as
+# the CSV, otherwise the CSV. With `refresh`, a Parquet copy that the CSV has
+# since outgrown (rows appended for an incremental run) is converted again
+# once instead of every reader falling back to parsing the CSV.
+def source_path(name, data_dir=".", refresh=False):
+    csv_path, parquet_path = table_paths(name, data_dir)
+    if not os.path.exists(parquet_path):
+        return csv_path
+    if os.path.exists(csv_path) and os.path.getmtime(parquet_path) < os.path.getmtime(
+        csv_path
+    ):
+        if not refresh:
+            return csv_path
+        print(f"♻️  {parquet_path} is older than {csv_path}; converting again")
+        convert_table(name, data_dir)
+    return parquet_path
+
+
+# start/end are inclusive bounds and `after` an exclusive lower bound on
+# `time_column`.
+def load_table(
+    name,
+    columns=None,
+    start=None,
+    end=None,
+    after=None,
+    time_column="timestamp",
+    data_dir=".",
+):
+    schema = schema_for(name)
+    path = source_path(name, data_dir, refresh=True)
+    bounds = [
+        (op, pd.Timestamp(value))
+        for op, value in ((">=", start), ("<=", end), (">", after))
+        if value is not None
+    ]
+
+    if path.endswith(".parquet"):
+        filters = [(time_column, op, value) for op, value in bounds] or None
+        return pd.read_parquet(path, engine="pyarrow", columns=columns, filters=filters)
+
+    if not bounds:
+        return apply_types(pd.read_csv(path, usecols=columns), schema)
+
+    # CSV fallback: filter chunk by chunk so only matching rows are kept
+    usecols = columns
+    if columns is not None and time_column not in columns:
+        usecols = list(columns) + [time_column]
+    chunks = []
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=CSV_CHUNKSIZE):
+        chunk = apply_types(chunk, schema)
+        mask = pd.Series(True, index=chunk.index)
+        for op, value in bounds:
+            if op == ">=":
+                mask &= chunk[time_column] >= value
+            elif op == "<=":
+                mask &= chunk[time_column] <= value
+            else:
+                mask &= chunk[time_column] > value
+        chunks.append(chunk.loc[mask, columns] if columns is not None else chunk[mask])
+    return pd.concat(chunks, ignore_index=True)
+
+
+# Yields the table in chunks of at most `chunksize` rows, typed like
+# load_table, so callers can keep memory flat regardless of table size.
+def iter_table(name, columns=None, chunksize=CSV_CHUNKSIZE, data_dir="."):
+    schema = schema_for(name)
+    path = source_path(name, data_dir, refresh=True)
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(
+            batch_size=chunksize, columns=columns
+        ):
+            yield batch.to_pandas()
+        return
+
+    for chunk in pd.read_csv(path, usecols=columns, chunksize=chunksize):
+        yield apply_types(chunk, schema)
+
+
+# ------------------------
+# Outputs
+# ------------------------
+# Stage outputs can be written as Parquet next to (or instead of) their
+# JSON/CSV form: one row per record, string columns dictionary-encoded, and
+# header fields such as the forecast period kept in the schema metadata.
+# Readers take whichever copy is newer, as source_path does for inputs, and
+# memory-map the Parquet file.
+OUTPUT_METADATA_KEY = b"pipeline"
+
+
+def format_list(choices):
+    def parse(value):
+        formats = [name.strip() for name in value.split(",") if name.strip()]
+        unknown = set(formats) - set(choices)
+        if unknown or not formats:
+            raise argparse.ArgumentTypeError(
+                f"expected a comma-separated list of {', '.join(choices)}"
+            )
+        return formats
+
+    return parse
+
+
+def write_parquet(df, path, metadata=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata is not None:
+        table = table.replace_schema_metadata(
+            {
+                **(table.schema.metadata or {}),
+                OUTPUT_METADATA_KEY: json.dumps(metadata).encode(),
+            }
+        )
+    strings = [
+        field.name
+        for field in table.schema
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type)
+    ]
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp_path, use_dictionary=strings, compression="zstd")
+    os.replace(tmp_path, path)
+    return path
+
+
+# `forecast` is the dict the forecast scripts have always written to JSON:
+# header fields plus a "forecast" list of records with `columns`. JSON is
+# written first so that, when both are requested, the Parquet copy is the
+# newer one readers pick.
+def write_forecast(stem, forecast, columns, formats):
+    paths = []
+    if "json" in formats:
+        tmp_path = f"{stem}.json.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(forecast, f, indent=2)
+        os.replace(tmp_path, stem + ".json")
+        paths.append(stem + ".json")
+    if "parquet" in formats:
+        header = {key: value for key, value in forecast.items() if key != "forecast"}
+        records = pd.DataFrame(forecast["forecast"], columns=columns)
+        paths.append(write_parquet(records, stem + ".parquet", header))
+    return paths
+
+
+def forecast_path(stem, data_dir="."):
+    stem = os.path.join(data_dir, stem)
+    json_path, parquet_path = stem + ".json", stem + ".parquet"
+    if os.path.exists(parquet_path) and (
+        not os.path.exists(json_path)
+        or os.path.getmtime(parquet_path) >= os.path.getmtime(json_path)
+    ):
+        return parquet_path
+    return json_path if os.path.exists(json_path) else None
+
+
+# Returns (header, records DataFrame), or None when neither copy exists.
+def read_forecast(stem, data_dir="."):
+    path = forecast_path(stem, data_dir)
+    if path is None:
+        return None
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path, memory_map=True)
+        header = json.loads((table.schema.metadata or {})[OUTPUT_METADATA_KEY])
+        return header, table.to_pandas()
+    with open(path) as f:
+        forecast = json.load(f)
+    records = pd.DataFrame(forecast.pop("forecast"))
+    return forecast, records
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert pipeline CSV inputs to typed Parquet"
+    )
+    parser.add_argument("--data-dir", default=".")
+    parser.add_argument("tables", nargs="*", default=list(TABLES))
+    args = parser.parse_args()
+
+    for name in args.tables:
+        if not os.path.exists(table_paths(name, args.data_dir)[0]):
+            print(f"⚠️ Skipped {name}: no CSV found")
+            continue
+        print(f"✅ Converted {name} -> {convert_table(name, args.data_dir)}")
+
+
+if __name__ == "__main__":
+    main()
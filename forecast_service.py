@@ -0,0 +1,298 @@
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from data_store import load_table, read_forecast, source_path, table_paths
+
+PRODUCT_FORECAST = "product_demand_forecast"
+ATTRIBUTE_FORECAST = "category_and_attribute_demand_forecast"
+INSIGHTS = "final_product_insights"
+ATTRIBUTE_KEYS = ["category", "season", "color"]
+INSIGHT_COLUMNS = [
+    "title",
+    "category",
+    "season",
+    "color",
+    "final_sentiment",
+    "trend_growth_rate",
+    "rank_score",
+]
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+# Header and records from the newer of the Parquet and JSON copies.
+def load_forecast(stem, data_dir, columns):
+    loaded = read_forecast(stem, data_dir)
+    if loaded is None:
+        return {"periodStart": None, "periodEnd": None}, pd.DataFrame(columns=columns)
+    return loaded
+
+
+# Plain Python values (None for NaN) so records serialize straight to JSON.
+def column_values(series):
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+# ------------------------
+# Snapshot
+# ------------------------
+# An immutable, fully built view of one set of output files. Product fields
+# are stored column-wise with a productId -> row dict, so a lookup is one
+# dict probe plus a few list indexes. Products are the union of the forecast
+# and the insight table; forecastedQuantity always comes from the forecast
+# file, which may be newer than the last final_model.py run.
+class ForecastSnapshot:
+    def __init__(self, data_dir="."):
+        product, forecast = load_forecast(
+            PRODUCT_FORECAST, data_dir, ["productId", "forecastedQuantity"]
+        )
+        attribute, attributes = load_forecast(
+            ATTRIBUTE_FORECAST, data_dir, ATTRIBUTE_KEYS + ["forecastedQuantity"]
+        )
+        self.product_period = (product["periodStart"], product["periodEnd"])
+        self.attribute_period = (attribute["periodStart"], attribute["periodEnd"])
+
+        if os.path.exists(source_path(INSIGHTS, data_dir)):
+            insights = load_table(
+                INSIGHTS, columns=["productId"] + INSIGHT_COLUMNS, data_dir=data_dir
+            )
+        else:
+            insights = pd.DataFrame(columns=["productId"] + INSIGHT_COLUMNS)
+        products = insights.merge(
+            forecast[["productId", "forecastedQuantity"]],
+            on="productId",
+            how="outer",
+            sort=False,
+        )
+        products["forecastedQuantity"] = products["forecastedQuantity"].astype("Int64")
+
+        self.ids = products["productId"].astype(str).tolist()
+        self.row = {pid: i for i, pid in enumerate(self.ids)}
+        self.columns = {
+            column: column_values(products[column])
+            for column in ["forecastedQuantity"] + INSIGHT_COLUMNS
+        }
+
+        # Rows with a rank_score, best first (stable, so ties keep file order)
+        score = products["rank_score"].to_numpy(dtype=float)
+        ranked = np.argsort(-score, kind="stable")
+        self.ranked = ranked[~np.isnan(score[ranked])]
+        self.rank = np.full(len(products), -1)
+        self.rank[self.ranked] = np.arange(1, len(self.ranked) + 1)
+        self.rank = self.rank.tolist()
+        self.attributes = {
+            column: products[column].to_numpy(dtype=object) for column in ATTRIBUTE_KEYS
+        }
+        self._top = {}  # (category, season, color) filter -> ranked rows
+
+        self.attribute_forecast = dict(
+            zip(
+                attributes[ATTRIBUTE_KEYS].itertuples(index=False, name=None),
+                attributes["forecastedQuantity"].astype(int).tolist(),
+            )
+        )
+
+    def record(self, i):
+        record = {"productId": self.ids[i], "rank": self.rank[i]}
+        for column, values in self.columns.items():
+            record[column] = values[i]
+        if record["rank"] < 0:
+            record["rank"] = None
+        return record
+
+    def product(self, product_id):
+        i = self.row.get(product_id)
+        return None if i is None else self.record(i)
+
+    def products(self, product_ids):
+        return [self.product(product_id) for product_id in product_ids]
+
+    def attribute(self, category, season="unknown", color="unknown"):
+        return self.attribute_forecast.get((category, season, color))
+
+    def attributes_batch(self, keys):
+        return [self.attribute_forecast.get(tuple(key)) for key in keys]
+
+    # Ranked rows matching a filter are computed once per snapshot and kept,
+    # so repeated top-N calls for the same slice are a list slice.
+    def top(self, n=10, category=None, season=None, color=None):
+        key = (category, season, color)
+        rows = self._top.get(key)
+        if rows is None:
+            mask = np.ones(len(self.ranked), dtype=bool)
+            for column, value in zip(ATTRIBUTE_KEYS, key):
+                if value is not None:
+                    mask &= self.attributes[column][self.ranked] == value
+            rows = self.ranked[mask].tolist()
+            self._top[key] = rows
+        return [self.record(i) for i in rows[:n]]
+
+
+# ------------------------
+# Service
+# ------------------------
+# Serves the current snapshot and swaps in a new one when any output file
+# changes. The swap is a single attribute assignment, so a reader sees either
+# the old snapshot or the new one, never a mix. Files are checked at most
+# every `check_interval` seconds, on the calling thread; one thread rebuilds
+# while the others keep serving the old snapshot. A rebuild that fails (a
+# file caught mid-write by a non-atomic writer) keeps the old snapshot and is
+# retried on the next check.
+class ForecastService:
+    def __init__(self, data_dir=".", check_interval=1.0):
+        self.data_dir = data_dir
+        self.check_interval = check_interval
+        self.paths = [
+            os.path.join(data_dir, stem + extension)
+            for stem in (PRODUCT_FORECAST, ATTRIBUTE_FORECAST)
+            for extension in (".json", ".parquet")
+        ] + list(table_paths(INSIGHTS, data_dir))
+        self.lock = threading.Lock()
+        self.signature = self.signatures()
+        self.snapshot = ForecastSnapshot(data_dir)
+        self.checked = time.monotonic()
+
+    def signatures(self):
+        return [file_signature(path) for path in self.paths]
+
+    def reload(self, force=False):
+        if not self.lock.acquire(blocking=False):
+            return False  # another thread is already rebuilding
+        try:
+            self.checked = time.monotonic()
+            signature = self.signatures()
+            if signature == self.signature and not force:
+                return False
+            try:
+                snapshot = ForecastSnapshot(self.data_dir)
+            except (OSError, ValueError, KeyError):
+                return False
+            self.snapshot, self.signature = snapshot, signature
+            return True
+        finally:
+            self.lock.release()
+
+    def current(self):
+        if time.monotonic() - self.checked >= self.check_interval:
+            self.reload()
+        return self.snapshot
+
+    def product(self, product_id):
+        return self.current().product(product_id)
+
+    def products(self, product_ids):
+        return self.current().products(product_ids)
+
+    def attribute(self, category, season="unknown", color="unknown"):
+        return self.current().attribute(category, season, color)
+
+    def attributes(self, keys):
+        return self.current().attributes_batch(keys)
+
+    def top(self, n=10, category=None, season=None, color=None):
+        return self.current().top(n, category, season, color)
+
+
+# ------------------------
+# HTTP Endpoint
+# ------------------------
+# GET /products?id=P1001&id=P1002
+# GET /attributes?category=dress&season=summer&color=red
+# GET /top?n=10[&category=dress][&season=...][&color=...]
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+
+            def first(name, default=None):
+                return query.get(name, [default])[0]
+
+            if url.path == "/products":
+                body = service.products(query.get("id", []))
+            elif url.path == "/attributes":
+                body = service.attribute(
+                    first("category"),
+                    first("season", "unknown"),
+                    first("color", "unknown"),
+                )
+            elif url.path == "/top":
+                try:
+                    n = int(first("n", 10))
+                except ValueError:
+                    n = -1
+                if n < 0:
+                    self.send_error(400, "n must be a non-negative integer")
+                    return
+                body = service.top(
+                    n,
+                    first("category"),
+                    first("season"),
+                    first("color"),
+                )
+            else:
+                self.send_error(404)
+                return
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Look up forecasts and insights from an in-memory index"
+    )
+    parser.add_argument("products", nargs="*", help="productIds to look up")
+    parser.add_argument("--data-dir", default=".")
+    parser.add_argument("--top", type=int, default=0, help="print the top N by rank")
+    parser.add_argument("--category", default=None)
+    parser.add_argument("--season", default=None)
+    parser.add_argument("--color", default=None)
+    parser.add_argument(
+        "--serve", type=int, metavar="PORT", help="serve lookups over HTTP on PORT"
+    )
+    args = parser.parse_args()
+
+    service = ForecastService(args.data_dir)
+    if args.serve:
+        server = ThreadingHTTPServer(("127.0.0.1", args.serve), make_handler(service))
+        print(f"🚀 Serving forecasts from {args.data_dir} on port {args.serve}")
+        server.serve_forever()
+        return
+
+    if args.products:
+        print(json.dumps(service.products(args.products), indent=2))
+    if args.top:
+        top = service.top(args.top, args.category, args.season, args.color)
+        print(json.dumps(top, indent=2))
+    if args.category and not args.top:
+        quantity = service.attribute(
+            args.category, args.season or "unknown", args.color or "unknown"
+        )
+        print(json.dumps(quantity))
+
+
+if __name__ == "__main__":
+    main()
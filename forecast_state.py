@@ -0,0 +1,71 @@
+import json
+import os
+import pickle
+
+import pandas as pd
+
+from forecasting import MIN_HISTORY, WINDOW, densify_daily
+
+# Enough dense days per series to rebuild lag1/rolling7 and to re-check the
+# MIN_HISTORY eligibility rule on the next run.
+TAIL_DAYS = MIN_HISTORY + WINDOW - 1
+
+
+# ------------------------
+# Persisted Forecast State
+# ------------------------
+# A state directory holds:
+#   meta.json   - mode and the sales watermark (last ingested timestamp)
+#   tail.csv    - last TAIL_DAYS dense daily rows per series
+#   models.pkl  - fitted models, their in-sample MAE and feature encodings
+def load_state(state_dir):
+    meta_path = os.path.join(state_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+    tail = pd.read_csv(os.path.join(state_dir, "tail.csv"), parse_dates=["timestamp"])
+    with open(os.path.join(state_dir, "models.pkl"), "rb") as f:
+        models = pickle.load(f)
+
+    return {
+        "mode": meta["mode"],
+        "watermark": pd.Timestamp(meta["watermark"]),
+        "tail": tail,
+        **models,
+    }
+
+
+def save_state(state_dir, state, keys="productId"):
+    os.makedirs(state_dir, exist_ok=True)
+    tail = trim_tail(state["tail"], keys)
+    models = {
+        key: value
+        for key, value in state.items()
+        if key not in ("mode", "watermark", "tail")
+    }
+
+    # Write everything to temp files first, then swap meta.json last so a
+    # crashed run never leaves a watermark pointing at stale models.
+    tail.to_csv(os.path.join(state_dir, "tail.csv.tmp"), index=False)
+    with open(os.path.join(state_dir, "models.pkl.tmp"), "wb") as f:
+        pickle.dump(models, f, protocol=pickle.HIGHEST_PROTOCOL)
+    with open(os.path.join(state_dir, "meta.json.tmp"), "w") as f:
+        json.dump(
+            {
+                "mode": state["mode"],
+                "watermark": state["watermark"].strftime("%Y-%m-%d"),
+            },
+            f,
+            indent=2,
+        )
+    for name in ("tail.csv", "models.pkl", "meta.json"):
+        os.replace(
+            os.path.join(state_dir, name + ".tmp"), os.path.join(state_dir, name)
+        )
+
+
+def trim_tail(daily, keys, days=TAIL_DAYS):
+    dense = densify_daily(daily, keys)
+    return dense.groupby(keys, sort=False).tail(days).reset_index(drop=True)
@@ -0,0 +1,264 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from profiling import profiled_call, profiler, span
+
+WINDOW = 7
+FEATURES = ["dayofweek", "month", "lag1", "rolling7"]
+MIN_HISTORY = 15
+
+
+# ------------------------
+# Feature Engineering
+# ------------------------
+# Reindexes every series to a dense daily calendar (its first to last date,
+# missing days filled with 0) with one MultiIndex reindex.
+def densify_daily(df, keys, date_col="timestamp", target_col="quantitySold"):
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    spans = df.groupby(keys)[date_col].agg(["min", "max"])
+    lengths = (spans["max"] - spans["min"]).dt.days.to_numpy() + 1
+    starts = np.cumsum(lengths) - lengths
+    position = np.arange(lengths.sum()) - np.repeat(starts, lengths)
+
+    key_arrays = [
+        np.repeat(spans.index.get_level_values(key).to_numpy(), lengths) for key in keys
+    ]
+    dates = np.repeat(spans["min"].to_numpy(), lengths) + position.astype(
+        "timedelta64[D]"
+    )
+    index = pd.MultiIndex.from_arrays(key_arrays + [dates], names=keys + [date_col])
+    return (
+        df.set_index(keys + [date_col])[[target_col]]
+        .reindex(index, fill_value=0)
+        .astype(float)
+        .reset_index()
+    )
+
+
+# Computes dayofweek, month, lag1 and rolling7 for all series of the dense
+# calendar at once. Rows without a full rolling window are dropped and series
+# shorter than `min_history` are removed, matching the per-series
+# asfreq/shift/rolling/dropna recipe.
+def build_daily_features(
+    df, keys, date_col="timestamp", target_col="quantitySold", min_history=MIN_HISTORY
+):
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    with span("densify_daily", rows=len(df), aggregate=True):
+        out = densify_daily(df, keys, date_col, target_col)
+    position = out.groupby(keys, sort=False).cumcount().to_numpy()
+
+    # Series are contiguous, so shifting/rolling the whole column and masking
+    # the first rows of each series equals a per-series shift/rolling.
+    out["dayofweek"] = out[date_col].dt.dayofweek
+    out["month"] = out[date_col].dt.month
+    out["lag1"] = out[target_col].shift(1).where(position >= 1)
+    out["rolling7"] = (
+        out[target_col].rolling(WINDOW).mean().where(position >= WINDOW - 1)
+    )
+    out = out[position >= WINDOW - 1]
+
+    sizes = out.groupby(keys, sort=False)[target_col].transform("size")
+    return out[sizes >= min_history].reset_index(drop=True)
+
+
+# Last date and last WINDOW target values of every series in a feature frame
+# from build_daily_features (every kept series has at least WINDOW rows).
+def last_window(features, keys, date_col="timestamp", target_col="quantitySold"):
+    tail = features.groupby(keys, sort=False).tail(WINDOW)
+    last = tail.groupby(keys, sort=False).tail(1)
+    history = tail[target_col].to_numpy().reshape(-1, WINDOW)
+    return last, last[date_col].to_numpy(), history
+
+
+# ------------------------
+# Demand Tiers
+# ------------------------
+# One groupby pass over the (key, day) rows: each series' days observed
+# (first date to `end`, the last date of the data, so a trailing run without
+# sales counts), days with demand, total volume, average demand interval
+# (ADI = days / demand days) and squared coefficient of variation of the
+# non-zero sizes. Series with no demand are "zero"; series whose own first to
+# last date is too short for the feature window, or with ADI at or above
+# `adi_threshold` (1.32, the Syntetos-Boylan cut-off), are "sparse"; the
+# rest are "dense".
+ADI_THRESHOLD = 1.32
+CROSTON_ALPHA = 0.1
+
+
+def classify_series(
+    df,
+    keys,
+    end=None,
+    date_col="timestamp",
+    target_col="quantitySold",
+    adi_threshold=ADI_THRESHOLD,
+    min_days=MIN_HISTORY + WINDOW - 1,
+):
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    end = df[date_col].max() if end is None else pd.Timestamp(end)
+    demand = df[target_col].where(df[target_col] > 0)
+    stats = (
+        df.assign(_demand=demand)
+        .groupby(keys)
+        .agg(
+            first=(date_col, "min"),
+            last=(date_col, "max"),
+            demand_days=("_demand", "count"),
+            volume=(target_col, "sum"),
+            size_mean=("_demand", "mean"),
+            size_var=("_demand", "var"),
+        )
+    )
+    stats["days"] = (end - stats["first"]).dt.days + 1
+    span_days = (stats["last"] - stats["first"]).dt.days + 1
+    stats["adi"] = stats["days"] / stats["demand_days"].where(stats["demand_days"] > 0)
+    stats["cv2"] = (stats["size_var"] / stats["size_mean"] ** 2).fillna(0)
+    stats["tier"] = np.select(
+        [
+            stats["demand_days"] == 0,
+            (span_days < min_days) | (stats["adi"] >= adi_threshold),
+        ],
+        ["zero", "sparse"],
+        "dense",
+    )
+    return stats[["days", "demand_days", "volume", "adi", "cv2", "tier"]]
+
+
+# Croston's method with the Syntetos-Boylan bias correction, for all series
+# at once. Demand sizes and the gaps between demand days are exponentially
+# smoothed per series, each series' interval seeded with its own first gap;
+# the closed-form sum of weights replaces the per-event recursion. A series
+# with a single demand day is seeded with the days from that sale to `end`.
+# When the days since the last sale exceed the smoothed interval, the rate
+# decays by (1 - alpha) per extra day (as TSB decays its demand probability),
+# so series that stopped selling fade to 0. Returns the expected demand per
+# day; series without demand get 0.
+def croston_sba(
+    df,
+    keys,
+    end=None,
+    date_col="timestamp",
+    target_col="quantitySold",
+    alpha=CROSTON_ALPHA,
+):
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    end = df[date_col].max() if end is None else pd.Timestamp(end)
+    events = df[df[target_col] > 0].sort_values(keys + [date_col])
+    day = (events[date_col] - end).dt.days.to_numpy()  # <= 0, end is day 0
+    grouped = events.groupby(keys, sort=False)
+    position = grouped.cumcount().to_numpy()
+    count = grouped[target_col].transform("size").to_numpy()
+    gap = day - np.roll(day, 1)
+    first_gap = np.roll(gap, -1)  # gap to the next event, read at position 0
+    interval = np.where(
+        position > 0, gap, np.where(count > 1, first_gap, 1 - day)
+    ).astype(float)
+
+    # Simple exponential smoothing initialized with the first event
+    weight = np.where(
+        position == 0,
+        (1 - alpha) ** (count - 1),
+        alpha * (1 - alpha) ** (count - 1 - position),
+    )
+    smoothed = pd.DataFrame(
+        {
+            "size": weight * events[target_col].to_numpy(dtype=float),
+            "interval": weight * interval,
+            "since_last": -day,
+        },
+        index=events.set_index(keys).index,
+    )
+    smoothed = smoothed.groupby(level=keys, sort=False).agg(
+        {"size": "sum", "interval": "sum", "since_last": "min"}
+    )
+    overdue = np.maximum(0, smoothed["since_last"] - smoothed["interval"])
+    rate = (
+        (1 - alpha / 2)
+        * smoothed["size"]
+        / smoothed["interval"]
+        * (1 - alpha) ** overdue
+    )
+    index = df.groupby(keys).size().index
+    return rate.reindex(index, fill_value=0.0)
+
+
+# ------------------------
+# Recursive Forecast Engine
+# ------------------------
+# Advances every series one day at a time. All lag1/rolling7 state lives in a
+# preallocated (n_series, WINDOW + horizon) array and each horizon step builds
+# a single feature matrix for all series, so a shared model costs exactly
+# `horizon` predict calls regardless of the number of series.
+def recursive_forecast(predict, last_dates, history, horizon, static=None):
+    last_dates = np.asarray(last_dates, dtype="datetime64[ns]")
+    n_series = len(last_dates)
+    n_static = 0 if static is None else np.asarray(static).shape[1]
+
+    values = np.zeros((n_series, WINDOW + horizon))
+    if n_series == 0:
+        return values[:, WINDOW:].astype(np.int64)
+
+    values[:, :WINDOW] = np.asarray(history, dtype=float)[:, -WINDOW:]
+    X = np.empty((n_series, 4 + n_static))
+    if n_static:
+        X[:, 4:] = static
+
+    for step in range(horizon):
+        next_day = pd.DatetimeIndex(last_dates + np.timedelta64(step + 1, "D"))
+        X[:, 0] = next_day.dayofweek
+        X[:, 1] = next_day.month
+        X[:, 2] = values[:, WINDOW + step - 1]  # lag1
+        X[:, 3] = values[:, step : WINDOW + step].mean(axis=1)  # rolling7
+        with span("predict_step", rows=n_series, aggregate=True):
+            preds = np.asarray(predict(X), dtype=float)
+        values[:, WINDOW + step] = np.maximum(0, preds.astype(int))  # no negatives
+
+    return values[:, WINDOW:].astype(np.int64)
+
+
+# Adapter for one model per series: row i of each step's feature matrix is
+# predicted by models[i], without building a DataFrame per call.
+def predict_per_series(models):
+    def predict(X):
+        preds = np.empty(len(models))
+        for i, model in enumerate(models):
+            with span("predict_series", rows=1, aggregate=True):
+                preds[i] = model.predict(X[i : i + 1])[0]
+        return preds
+
+    return predict
+
+
+# ------------------------
+# Parallel Sharding
+# ------------------------
+# Split a frame into `n_shards` contiguous groups of whole series, keeping the
+# groupby order so concatenated shard results match a serial run.
+def shard_by_key(df, keys, n_shards):
+    group_ids = df.groupby(keys, sort=True).ngroup()
+    n_groups = group_ids.max() + 1 if len(group_ids) else 0
+    n_shards = max(1, min(n_shards, n_groups))
+    shard_ids = group_ids.to_numpy() * n_shards // max(n_groups, 1)
+    return [df[shard_ids == i] for i in range(n_shards)]
+
+
+# Run fn(shard, *args) for every shard, on a process pool when workers > 1.
+# Results stream back as shards finish and are reassembled in shard order;
+# per-series timings recorded in the workers are merged into this process's
+# profile.
+def run_sharded(fn, shards, workers, *args):
+    if workers <= 1 or len(shards) <= 1:
+        results = [fn(shard, *args) for shard in shards]
+    else:
+        results = [None] * len(shards)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(profiled_call, fn, shard, *args): i
+                for i, shard in enumerate(shards)
+            }
+            for future in as_completed(futures):
+                results[futures[future]], totals = future.result()
+                profiler.merge_totals(totals)
+    return [item for result in results for item in result]
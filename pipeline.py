@@ -0,0 +1,329 @@
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from catalog_attributes import file_digest
+from data_store import CACHE_DIR, TABLES, source_path
+from profiling import PROFILE_ENV, combine_reports
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_NAME = "pipeline_state.json"
+
+# ------------------------
+# Stage Graph
+# ------------------------
+# Each stage is a script run from the data directory. Inputs are files (or
+# data_store table names, resolved to the CSV or Parquet copy load_table
+# would read) and outputs are the files it writes; a stage depends on
+# whichever stages produce its inputs. Growth Rate.py writes query_growth.csv
+# directly for final_model.py, so nothing is copied between directories.
+# Forecasts are exchanged as Parquet; final_model.py also writes a Parquet
+# copy of its CSV for forecast_service.py. Category forecasts are summed from
+# 30-day product forecasts, so models are trained at product level only, and
+# only for products with dense demand.
+STAGES = {
+    "product_forecast": {
+        "script": "product_demand_forecast.py",
+        "args": ["--leaf-days", "30", "--tiered"],
+        "inputs": ["sales_data", "product_catalog"],
+        "outputs": [
+            "product_demand_forecast.parquet",
+            "product_leaf_forecast.parquet",
+        ],
+    },
+    "category_forecast": {
+        "script": "category_and_attribute_demand_forecast.py",
+        "args": ["--reconcile", "bottom-up"],
+        "inputs": ["product_leaf_forecast.parquet", "product_catalog"],
+        "outputs": ["category_and_attribute_demand_forecast.parquet"],
+    },
+    "sentiment": {
+        "script": "Sentiment Analysis/sentiment_analysis.py",
+        "inputs": ["customer_feedback"],
+        "outputs": [
+            "customer_feedback_sentiment_enriched.csv",
+            "product_sentiment_summary.csv",
+        ],
+    },
+    "search_trend": {
+        "script": "Search Trend/search_trend.py",
+        "inputs": ["search_trends"],
+        "outputs": [
+            "top_trending_keywords.json",
+            "top_10_trending_keywords_categorized.csv",
+            "all_trending_keywords_categorized.csv",
+        ],
+    },
+    "trend_growth": {
+        "script": "Search Trend/Growth Rate.py",
+        "args": ["--output", "query_growth.csv"],
+        "inputs": ["search_trends"],
+        "outputs": ["query_growth.csv"],
+    },
+    "final": {
+        "script": "Final/final_model.py",
+        "args": ["--format", "csv,parquet"],
+        "inputs": [
+            "product_catalog",
+            "product_demand_forecast.parquet",
+            "product_sentiment_summary.csv",
+            "query_growth.csv",
+        ],
+        "outputs": ["final_product_insights.csv", "final_product_insights.parquet"],
+    },
+}
+
+
+def upstream(stages):
+    producer = {
+        output: name for name, stage in stages.items() for output in stage["outputs"]
+    }
+    return {
+        name: sorted(
+            {producer[path] for path in stage["inputs"] if path in producer} - {name}
+        )
+        for name, stage in stages.items()
+    }
+
+
+# Selected stages plus everything they depend on, in the graph's order.
+def with_dependencies(targets, deps):
+    selected, pending = set(), list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(deps[name])
+    return [name for name in STAGES if name in selected]
+
+
+# Repo modules a script imports, directly or through other repo modules,
+# resolved the way the scripts' sys.path does: next to the importing file,
+# then at the repo root.
+def local_modules(script):
+    found, pending = set(), [script]
+    while pending:
+        path = pending.pop()
+        with open(path) as f:
+            tree = ast.parse(f.read(), path)
+        names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.update(alias.name.split(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names.add(node.module.split(".")[0])
+        for name in names:
+            for directory in (os.path.dirname(path), ROOT):
+                candidate = os.path.join(directory, name + ".py")
+                if os.path.exists(candidate):
+                    if candidate not in found:
+                        found.add(candidate)
+                        pending.append(candidate)
+                    break
+    return sorted(found - {script})
+
+
+# ------------------------
+# Fingerprints
+# ------------------------
+# A stage's fingerprint hashes its script and every repo module it imports,
+# its arguments and the content of every input, so editing shared code such
+# as forecasting.py reruns the stages that use it. Digests are remembered per
+# (path, size, mtime) so unchanged multi-GB inputs are not re-read on every
+# run.
+class Fingerprints:
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, CACHE_DIR, STATE_NAME)
+        self.state = {"digests": {}, "stages": {}}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.state = json.load(f)
+
+    def resolve(self, path):
+        if path in TABLES:
+            return source_path(path, self.data_dir, refresh=True)
+        return os.path.join(self.data_dir, path)
+
+    def digest(self, path):
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        cached = self.state["digests"].get(path)
+        if cached and cached["signature"] == signature:
+            return cached["sha1"]
+        sha1 = file_digest(path)
+        self.state["digests"][path] = {"signature": signature, "sha1": sha1}
+        return sha1
+
+    def stage(self, name):
+        stage = STAGES[name]
+        digest = hashlib.sha1()
+        script = os.path.join(ROOT, stage["script"])
+        for path in [script] + local_modules(script):
+            digest.update(f"{os.path.relpath(path, ROOT)}={self.digest(path)}".encode())
+        digest.update(json.dumps(stage.get("args", [])).encode())
+        for path in stage["inputs"]:
+            digest.update(f"{path}={self.digest(self.resolve(path))}".encode())
+        return digest.hexdigest()
+
+    def up_to_date(self, name, fingerprint):
+        outputs = STAGES[name]["outputs"]
+        return self.state["stages"].get(name) == fingerprint and all(
+            os.path.exists(self.resolve(path)) for path in outputs
+        )
+
+    def record(self, name, fingerprint):
+        self.state["stages"][name] = fingerprint
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(self.path + ".tmp", self.path)
+
+
+# ------------------------
+# Runner
+# ------------------------
+def run_stage(name, data_dir, profile_dir=None):
+    stage = STAGES[name]
+    command = [sys.executable, os.path.join(ROOT, stage["script"])]
+    env = dict(os.environ)
+    if profile_dir:
+        env[PROFILE_ENV] = os.path.join(profile_dir, name + ".json")
+    start = time.perf_counter()
+    result = subprocess.run(
+        command + stage.get("args", []),
+        cwd=data_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    return result, start, time.perf_counter() - start
+
+
+# Runs stages as soon as their upstream stages finish, up to `jobs` at a
+# time. A stage is skipped when its fingerprint matches the last successful
+# run and its outputs exist; stages downstream of a failure are not run.
+# With `profile`, every stage that ran writes a profiling report and they are
+# merged into one trace-event JSON at that path.
+def run_pipeline(
+    targets=None, data_dir=".", jobs=4, force=False, dry_run=False, profile=None
+):
+    profile_dir = os.path.join(data_dir, CACHE_DIR, "profile") if profile else None
+    origin, runs = time.perf_counter(), []
+    deps = upstream(STAGES)
+    order = with_dependencies(targets or list(STAGES), deps)
+    fingerprints = Fingerprints(data_dir)
+    status = {}
+
+    def ready():
+        return [
+            name
+            for name in order
+            if name not in status and all(status.get(dep) for dep in deps[name])
+        ]
+
+    running, started = {}, set()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while True:
+            for name in ready():
+                if name in started or len(running) >= jobs:
+                    continue
+                # In a dry run, stages downstream of a planned one would see
+                # new upstream outputs, so they are planned too.
+                planned = any(status.get(dep) == "planned" for dep in deps[name])
+                fingerprint = fingerprints.stage(name)
+                if (
+                    not force
+                    and not planned
+                    and fingerprints.up_to_date(name, fingerprint)
+                ):
+                    print(f"⏭️  {name}: inputs unchanged, skipped")
+                    status[name] = "skipped"
+                    continue
+                if dry_run:
+                    print(f"▶️  {name}: would run")
+                    status[name] = "planned"
+                    continue
+                print(f"▶️  {name}: running")
+                started.add(name)
+                future = executor.submit(run_stage, name, data_dir, profile_dir)
+                running[future] = (name, fingerprint)
+            if not running:
+                if ready():
+                    continue  # skips unlocked more stages
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fingerprint = running.pop(future)
+                result, start, wall = future.result()
+                if profile_dir:
+                    report_path = os.path.join(profile_dir, name + ".json")
+                    report = {}
+                    if os.path.exists(report_path):
+                        with open(report_path) as f:
+                            report = json.load(f)
+                    runs.append((name, start - origin, wall, report))
+                if result.returncode == 0:
+                    fingerprints.record(name, fingerprint)
+                    fingerprints.save()
+                    status[name] = "ran"
+                    print(f"✅ {name}: done")
+                else:
+                    status[name] = ""
+                    print(f"❌ {name}: exit code {result.returncode}")
+                    print(result.stdout[-2000:] + result.stderr[-2000:])
+
+    for name in order:
+        if name not in status:
+            print(f"⚠️ {name}: not run (upstream failed)")
+    if profile:
+        combine_reports(runs, profile)
+        print(f"📊 Profile written to {profile}")
+    return {name: status.get(name) or "failed" for name in order}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the insight pipeline DAG")
+    parser.add_argument(
+        "stages", nargs="*", help=f"stages to bring up to date: {', '.join(STAGES)}"
+    )
+    parser.add_argument("--data-dir", default=".")
+    parser.add_argument("--jobs", type=int, default=4, help="concurrent stages")
+    parser.add_argument("--force", action="store_true", help="ignore fingerprints")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument(
+        "--profile",
+        metavar="REPORT",
+        help="write per-stage timings, CPU, peak RSS and row counts as trace JSON",
+    )
+    args = parser.parse_args()
+
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    status = run_pipeline(
+        args.stages,
+        os.path.abspath(args.data_dir),
+        args.jobs,
+        args.force,
+        args.dry_run,
+        args.profile,
+    )
+    if any(state == "failed" for state in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,84 +1,459 @@
+import argparse
+import os
 import pandas as pd
+import numpy as np
 from xgboost import XGBRegressor
 from datetime import timedelta
-import json
+
+from data_store import format_list, load_table, table_paths, write_forecast
+from forecast_state import load_state, save_state
+from profiling import span
+from forecasting import (
+    FEATURES,
+    build_daily_features,
+    classify_series,
+    croston_sba,
+    last_window,
+    predict_per_series,
+    recursive_forecast,
+    run_sharded,
+    shard_by_key,
+)
+
+GLOBAL_FEATURES = FEATURES + ["product_code", "category_code"]
+LEAF_FORECAST = "product_leaf_forecast"
+TIERS = ["dense", "sparse", "zero"]
+
 
 # ------------------------
 # 1. Load & Preprocess
 # ------------------------
-sales = pd.read_csv("sales_data.csv")
-sales["timestamp"] = pd.to_datetime(sales["timestamp"])
-sales["quantitySold"] = sales["quantitySold"].astype(int)
+def aggregate_sales(sales):
+    sales["quantitySold"] = sales["quantitySold"].astype(int)
+    return sales.groupby(["productId", "timestamp"])["quantitySold"].sum().reset_index()
+
+
+def load_sales(name="sales_data", after=None):
+    sales = load_table(
+        name, columns=["productId", "timestamp", "quantitySold"], after=after
+    )
+    return aggregate_sales(sales)
 
-agg = sales.groupby(["productId", "timestamp"]).sum().reset_index()
 
 # ------------------------
-# 2. Forecast Settings
+# 2. Per-product Forecast
 # ------------------------
-forecast_start = pd.to_datetime("2025-06-01")
-forecast_days = 7
-forecast_end = forecast_start + timedelta(days=forecast_days - 1)
-product_output = []
+def fit_per_product(features, n_jobs=None):
+    models = {}
+    for product_id, product_df in features.groupby("productId", sort=False):
+        model = XGBRegressor(n_estimators=20, max_depth=3, verbosity=0, n_jobs=n_jobs)
+        with span("fit_series", rows=len(product_df), aggregate=True):
+            model.fit(
+                product_df[FEATURES].to_numpy(dtype=float), product_df["quantitySold"]
+            )
+        models[product_id] = model
+    return models
+
+
+# One record per product with its total over forecast_days. With leaf_days,
+# the recursion runs long enough to also total the first leaf_days days
+# (leafQuantity), which the category forecast aggregates in --reconcile modes.
+def forecast_records(product_ids, preds, forecast_days, leaf_days=0):
+    totals = preds[:, :forecast_days].sum(axis=1)
+    if not leaf_days:
+        return [
+            {"productId": product_id, "forecastedQuantity": int(total)}
+            for product_id, total in zip(product_ids, totals)
+        ]
+    leaf_totals = preds[:, :leaf_days].sum(axis=1)
+    return [
+        {
+            "productId": product_id,
+            "forecastedQuantity": int(total),
+            "leafQuantity": int(leaf_total),
+        }
+        for product_id, total, leaf_total in zip(product_ids, totals, leaf_totals)
+    ]
+
+
+def forecast_with_models(features, models, forecast_days, leaf_days=0):
+    last, last_dates, history = last_window(features, "productId")
+    preds = recursive_forecast(
+        predict_per_series([models[product_id] for product_id in last["productId"]]),
+        last_dates,
+        history,
+        max(forecast_days, leaf_days),
+    )
+    return forecast_records(last["productId"], preds, forecast_days, leaf_days)
+
+
+def forecast_per_product(agg, forecast_days, n_jobs=None, leaf_days=0):
+    features = build_daily_features(agg, "productId")  # skips short history
+    models = fit_per_product(features, n_jobs)
+    return forecast_with_models(features, models, forecast_days, leaf_days)
+
 
 # ------------------------
-# 3. Forecast Loop
+# Tiered Forecast
 # ------------------------
-for product_id in agg["productId"].unique():
-    product_df = agg[agg["productId"] == product_id].copy()
-    product_df = product_df.set_index("timestamp").asfreq("D").fillna(0).reset_index()
-
-    # Features
-    product_df["dayofweek"] = product_df["timestamp"].dt.dayofweek
-    product_df["month"] = product_df["timestamp"].dt.month
-    product_df["lag1"] = product_df["quantitySold"].shift(1)
-    product_df["rolling7"] = product_df["quantitySold"].rolling(7).mean()
-    product_df.dropna(inplace=True)
-
-    if len(product_df) < 15:
-        continue  # skip short history
-
-    features = ["dayofweek", "month", "lag1", "rolling7"]
-    model = XGBRegressor(n_estimators=20, max_depth=3, verbosity=0)
-    model.fit(product_df[features], product_df["quantitySold"])
-
-    # Forecast
-    preds = []
-    last_known = product_df.iloc[-1].copy()
-    recent_sales = product_df["quantitySold"][-7:].tolist()
-
-    for _ in range(forecast_days):
-        next_day = last_known["timestamp"] + timedelta(days=1)
-        next_input = {
-            "dayofweek": next_day.dayofweek,
-            "month": next_day.month,
-            "lag1": last_known["quantitySold"],
-            "rolling7": sum(recent_sales[-7:]) / len(recent_sales[-7:]),
-        }
+# With --tiered, only "dense" products (see classify_series) reach the
+# XGBoost path. Sparse products, including those with too little history
+# for the feature window that are otherwise dropped, are forecast with
+# Croston/SBA, and products that never sold forecast 0.
+def split_tiers(agg, end):
+    tiers = classify_series(agg, "productId", end)
+    dense = agg["productId"].isin(tiers.index[tiers["tier"] == "dense"])
+    counts = tiers["tier"].value_counts()
+    summary = ", ".join(f"{counts.get(tier, 0)} {tier}" for tier in TIERS)
+    print(f"✅ Tiers: {summary}")
+    return agg[dense], agg[~dense]
+
+
+def forecast_sparse(sparse, end, forecast_days, leaf_days=0):
+    rate = croston_sba(sparse, "productId", end)
+    preds = rate.to_numpy()[:, None] * np.ones(max(forecast_days, leaf_days))
+    return forecast_records(rate.index, preds, forecast_days, leaf_days)
+
+
+# ------------------------
+# 3. Global Forecast
+# ------------------------
+# Product and category codes are kept in index dicts so incremental runs can
+# extend them without renumbering products the model was trained on.
+def encode_products(
+    df, product_index=None, category_index=None, catalog="product_catalog"
+):
+    product_index = dict(product_index or {})
+    category_index = dict(category_index or {})
+
+    if any(os.path.exists(path) for path in table_paths(catalog)):
+        categories = load_table(catalog, columns=["productId", "category"])
+        category = df["productId"].map(
+            categories.drop_duplicates("productId").set_index("productId")["category"]
+        )
+    else:
+        category = pd.Series(np.nan, index=df.index)
+
+    for product_id in sorted(set(df["productId"]) - set(product_index)):
+        product_index[product_id] = len(product_index)
+    for name in sorted(set(category.dropna()) - set(category_index)):
+        category_index[name] = len(category_index)
+
+    product_codes = df["productId"].map(product_index).to_numpy()
+    category_codes = category.map(category_index).fillna(-1).to_numpy()  # unknown
+    return product_codes, category_codes, product_index, category_index
+
+
+def fit_global(df, n_jobs=None):
+    model = XGBRegressor(n_estimators=200, max_depth=6, verbosity=0, n_jobs=n_jobs)
+    with span("fit_global", rows=len(df)):
+        model.fit(df[GLOBAL_FEATURES].to_numpy(dtype=float), df["quantitySold"])
+    return model
+
+
+def forecast_with_global_model(df, model, forecast_days, leaf_days=0):
+    # Recursive forecast: one predict call per horizon step for all products
+    last, last_dates, history = last_window(df, "productId")
+    preds = recursive_forecast(
+        model.predict,
+        last_dates,
+        history,
+        max(forecast_days, leaf_days),
+        static=last[["product_code", "category_code"]].to_numpy(dtype=float),
+    )
+    return forecast_records(last["productId"], preds, forecast_days, leaf_days)
+
+
+def forecast_global(agg, forecast_days, n_jobs=None, leaf_days=0):
+    df = build_daily_features(agg, "productId")
+    df["product_code"], df["category_code"], _, _ = encode_products(df)
+    model = fit_global(df, n_jobs)
+    return forecast_with_global_model(df, model, forecast_days, leaf_days)
+
+
+# ------------------------
+# 4. Incremental Forecast
+# ------------------------
+# Models are persisted with the tail of each series. Each run ingests only
+# sales newer than the watermark, reuses a model when its error on the new
+# days stays within the drift tolerance of its in-sample error, and otherwise
+# warm-starts it with WARM_START_ROUNDS extra boosting rounds on the new days.
+WARM_START_ROUNDS = 10
+
+
+def mean_abs_error(model, df, features):
+    pred = model.predict(df[features].to_numpy(dtype=float))
+    return float(np.abs(pred - df["quantitySold"].to_numpy()).mean())
+
+
+def drifted(error, baseline, tolerance):
+    return error > (1 + tolerance) * baseline + 1
+
+
+def warm_start(model, df, features, n_jobs=None):
+    params = model.get_params()
+    params.update(n_estimators=WARM_START_ROUNDS, n_jobs=n_jobs)
+    updated = XGBRegressor(**params)
+    updated.fit(
+        df[features].to_numpy(dtype=float),
+        df["quantitySold"],
+        xgb_model=model.get_booster(),
+    )
+    return updated
+
+
+def fit_products_shard(agg, n_jobs=None):
+    features = build_daily_features(agg, "productId")
+    models = fit_per_product(features, n_jobs)
+    fitted = []
+    for product_id, product_df in features.groupby("productId", sort=False):
+        model = models[product_id]
+        fitted.append((product_id, model, mean_abs_error(model, product_df, FEATURES)))
+    return fitted
+
+
+def update_per_product(state, features, fresh, tolerance, n_jobs=None):
+    models, mae = state["models"], state["mae"]
+    fresh_groups = dict(tuple(fresh.groupby("productId", sort=False)))
+    counts = {"reused": 0, "warm-started": 0, "new": 0}
+
+    for product_id, product_df in features.groupby("productId", sort=False):
+        if product_id not in models:
+            (model,) = fit_per_product(product_df, n_jobs).values()
+            models[product_id] = model
+            mae[product_id] = mean_abs_error(model, product_df, FEATURES)
+            counts["new"] += 1
+            continue
+        new_rows = fresh_groups.get(product_id)
+        if new_rows is None:
+            counts["reused"] += 1
+            continue
+
+        error = mean_abs_error(models[product_id], new_rows, FEATURES)
+        if drifted(error, mae[product_id], tolerance):
+            models[product_id] = warm_start(
+                models[product_id], new_rows, FEATURES, n_jobs
+            )
+            mae[product_id] = mean_abs_error(models[product_id], new_rows, FEATURES)
+            counts["warm-started"] += 1
+        else:
+            counts["reused"] += 1
+    return counts
+
+
+def update_global(state, fresh, tolerance, n_jobs=None):
+    if fresh.empty:
+        return {"reused": 1, "warm-started": 0}
+    error = mean_abs_error(state["model"], fresh, GLOBAL_FEATURES)
+    if not drifted(error, state["mae"], tolerance):
+        return {"reused": 1, "warm-started": 0}
+    state["model"] = warm_start(state["model"], fresh, GLOBAL_FEATURES, n_jobs)
+    state["mae"] = mean_abs_error(state["model"], fresh, GLOBAL_FEATURES)
+    return {"reused": 0, "warm-started": 1}
 
-        pred = model.predict(pd.DataFrame([next_input]))[0]
-        pred = max(0, int(pred))  # no negatives
-        preds.append(pred)
 
-        # update loop
-        new_row = {"timestamp": next_day, "quantitySold": pred}
-        recent_sales.append(pred)
-        last_known = new_row
-        product_df = pd.concat([product_df, pd.DataFrame([new_row])], ignore_index=True)
+def forecast_incremental(args, forecast_days, n_jobs=None):
+    state = load_state(args.state_dir)
 
-    product_output.append(
-        {"productId": product_id, "forecastedQuantity": int(sum(preds))}
+    if state is None or state["mode"] != args.mode:
+        # Bootstrap: full history, full training
+        daily = load_sales(args.sales)
+        state = {"mode": args.mode, "watermark": daily["timestamp"].max()}
+        features = build_daily_features(daily, "productId")
+        if args.mode == "global":
+            (
+                features["product_code"],
+                features["category_code"],
+                state["product_index"],
+                state["category_index"],
+            ) = encode_products(features)
+            state["model"] = fit_global(features, n_jobs)
+            state["mae"] = mean_abs_error(state["model"], features, GLOBAL_FEATURES)
+        else:
+            fitted = run_sharded(
+                fit_products_shard,
+                shard_by_key(daily, "productId", args.workers),
+                args.workers,
+                1 if args.workers > 1 else None,
+            )
+            state["models"] = {product_id: model for product_id, model, _ in fitted}
+            state["mae"] = {product_id: error for product_id, _, error in fitted}
+        print(f"✅ Initialized forecast state in {args.state_dir}")
+    else:
+        new_sales = load_table(
+            args.sales,
+            columns=["productId", "timestamp", "quantitySold"],
+            after=state["watermark"],
+        )
+        tail = state["tail"]
+        previous_end = tail.groupby("productId")["timestamp"].max()
+        daily = pd.concat([tail, aggregate_sales(new_sales)], ignore_index=True)
+        features = build_daily_features(daily, "productId")
+        fresh = features[
+            features["timestamp"]
+            > features["productId"].map(previous_end).fillna(pd.Timestamp.min)
+        ]
+
+        if args.mode == "global":
+            (
+                features["product_code"],
+                features["category_code"],
+                state["product_index"],
+                state["category_index"],
+            ) = encode_products(
+                features, state["product_index"], state["category_index"]
+            )
+            fresh = features.loc[fresh.index]
+            counts = update_global(state, fresh, args.drift_tolerance, n_jobs)
+        else:
+            counts = update_per_product(
+                state, features, fresh, args.drift_tolerance, n_jobs
+            )
+        if not new_sales.empty:
+            state["watermark"] = max(state["watermark"], new_sales["timestamp"].max())
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        print(f"✅ Ingested {len(new_sales)} new sales rows; models: {summary}")
+
+    state["tail"] = daily
+    save_state(args.state_dir, state)
+
+    if args.mode == "global":
+        return forecast_with_global_model(
+            features, state["model"], forecast_days, args.leaf_days
+        )
+    return forecast_with_models(
+        features, state["models"], forecast_days, args.leaf_days
     )
 
+
 # ------------------------
-# 4. Save Output
+# 5. Save Output
 # ------------------------
-forecast_json = {
-    "periodStart": forecast_start.strftime("%Y-%m-%d"),
-    "periodEnd": forecast_end.strftime("%Y-%m-%d"),
-    "forecast": product_output,
-}
+def main():
+    parser = argparse.ArgumentParser(description="Forecast 7-day demand per product")
+    parser.add_argument(
+        "--mode",
+        choices=["per-product", "global"],
+        default="per-product",
+        help="train one model per productId, or one global model for all products",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="shard per-product models across N processes (global mode: N threads)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="reuse persisted models and ingest only sales newer than the watermark",
+    )
+    parser.add_argument("--sales", default="sales_data.csv")
+    parser.add_argument("--state-dir", default="forecast_state")
+    parser.add_argument(
+        "--drift-tolerance",
+        type=float,
+        default=0.5,
+        help="relative MAE increase on new days that triggers a warm start",
+    )
+    parser.add_argument(
+        "--format",
+        type=format_list(["parquet", "json"]),
+        default=["parquet"],
+        help="comma-separated output formats: parquet (default) and/or json",
+    )
+    parser.add_argument(
+        "--leaf-days",
+        type=int,
+        default=0,
+        help="also write per-product totals over this many days to "
+        f"{LEAF_FORECAST}.parquet for hierarchical category forecasts",
+    )
+    parser.add_argument(
+        "--tiered",
+        action="store_true",
+        help="fit models for dense products only; Croston/SBA for sparse ones",
+    )
+    args = parser.parse_args()
+    if args.tiered and args.incremental:
+        parser.error("--tiered is not supported with --incremental")
+
+    forecast_start = pd.to_datetime("2025-06-01")
+    forecast_days = 7
+    forecast_end = forecast_start + timedelta(days=forecast_days - 1)
+
+    if args.incremental:
+        with span("forecast_incremental"):
+            product_output = forecast_incremental(
+                args, forecast_days, n_jobs=args.workers if args.workers > 1 else None
+            )
+    else:
+        with span("load_sales") as info:
+            agg = load_sales(args.sales)
+            info["rows"] = len(agg)
+        if args.tiered:
+            with span("classify_series", rows=len(agg)):
+                end = agg["timestamp"].max()
+                agg, sparse = split_tiers(agg, end)
+        with span("forecast", rows=len(agg)):
+            if args.mode == "global":
+                product_output = forecast_global(
+                    agg,
+                    forecast_days,
+                    n_jobs=args.workers if args.workers > 1 else None,
+                    leaf_days=args.leaf_days,
+                )
+            else:
+                # Pin XGBoost to one thread per worker process to avoid
+                # oversubscription
+                n_jobs = 1 if args.workers > 1 else None
+                product_output = run_sharded(
+                    forecast_per_product,
+                    shard_by_key(agg, "productId", args.workers),
+                    args.workers,
+                    forecast_days,
+                    n_jobs,
+                    args.leaf_days,
+                )
+        if args.tiered:
+            with span("forecast_sparse", rows=len(sparse)):
+                product_output += forecast_sparse(
+                    sparse, end, forecast_days, args.leaf_days
+                )
+            product_output.sort(key=lambda record: record["productId"])
+
+    if args.leaf_days:
+        leaf_end = forecast_start + timedelta(days=args.leaf_days - 1)
+        leaf_json = {
+            "periodStart": forecast_start.strftime("%Y-%m-%d"),
+            "periodEnd": leaf_end.strftime("%Y-%m-%d"),
+            "forecast": [
+                {
+                    "productId": record["productId"],
+                    "forecastedQuantity": record.pop("leafQuantity"),
+                }
+                for record in product_output
+            ],
+        }
+        write_forecast(
+            LEAF_FORECAST, leaf_json, ["productId", "forecastedQuantity"], ["parquet"]
+        )
+
+    forecast_json = {
+        "periodStart": forecast_start.strftime("%Y-%m-%d"),
+        "periodEnd": forecast_end.strftime("%Y-%m-%d"),
+        "forecast": product_output,
+    }
+
+    with span("write_output", rows=len(forecast_json["forecast"])):
+        paths = write_forecast(
+            "product_demand_forecast",
+            forecast_json,
+            ["productId", "forecastedQuantity"],
+            args.format,
+        )
+    print(f"✅ Forecast saved to {', '.join(paths)}")
 
-with open("product_demand_forecast.json", "w") as f:
-    json.dump(forecast_json, f, indent=2)
 
-print("✅ Forecast saved to product_demand_forecast.json")
+if __name__ == "__main__":
+    main()
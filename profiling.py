@@ -0,0 +1,183 @@
+import atexit
+import json
+import multiprocessing
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource  # not available on Windows
+except ImportError:
+    resource = None
+
+# Path of the JSON report; when unset, spans are still timed but nothing is
+# written. pipeline.py sets it per stage with --profile.
+PROFILE_ENV = "PIPELINE_PROFILE"
+
+
+def peak_rss_mb(who="self"):
+    if resource is None:
+        return None
+    usage = resource.getrusage(
+        resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN
+    )
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes vs KiB
+    return round(usage.ru_maxrss / scale, 1)
+
+
+# ------------------------
+# Stage Profiler
+# ------------------------
+# span(name) records wall time, CPU time, the process's peak RSS so far and an
+# optional row count. Hot inner steps (one model fit or predict per series)
+# pass aggregate=True and are folded into per-name totals instead of one
+# event each. The report is a Chrome trace-event file (traceEvents, viewable
+# in chrome://tracing or Perfetto) with the totals alongside.
+class Profiler:
+    def __init__(self, stage):
+        self.stage = stage
+        self.events = []
+        self.totals = {}
+        self.origin = time.perf_counter()
+        self.cpu_origin = time.process_time()
+
+    @contextmanager
+    def span(self, name, rows=None, aggregate=False):
+        info = {"rows": rows}  # callers may fill in rows once known
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield info
+        finally:
+            wall = time.perf_counter() - start
+            cpu = time.process_time() - cpu_start
+            if aggregate:
+                total = self.totals.setdefault(
+                    name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows": 0}
+                )
+                total["calls"] += 1
+                total["wall_s"] += wall
+                total["cpu_s"] += cpu
+                total["rows"] += info["rows"] or 0
+            else:
+                self.events.append(
+                    {
+                        "name": name,
+                        "start_s": start - self.origin,
+                        "wall_s": wall,
+                        "cpu_s": cpu,
+                        "peak_rss_mb": peak_rss_mb(),
+                        "rows": info["rows"],
+                    }
+                )
+
+    def report(self):
+        pid = os.getpid()
+        trace = [
+            {
+                "name": event["name"],
+                "ph": "X",
+                "pid": pid,
+                "tid": 0,
+                "ts": round(event["start_s"] * 1e6),
+                "dur": round(event["wall_s"] * 1e6),
+                "args": {
+                    key: event[key]
+                    for key in ("cpu_s", "peak_rss_mb", "rows")
+                    if event[key] is not None
+                },
+            }
+            for event in self.events
+        ]
+        return {
+            "traceEvents": trace,
+            "stage": self.stage,
+            "wall_s": round(time.perf_counter() - self.origin, 4),
+            "cpu_s": round(time.process_time() - self.cpu_origin, 4),
+            "peak_rss_mb": peak_rss_mb(),
+            "children_peak_rss_mb": peak_rss_mb("children"),
+            "spans": [
+                {
+                    key: round(v, 4) if isinstance(v, float) else v
+                    for key, v in e.items()
+                }
+                for e in self.events
+            ],
+            "totals": {
+                name: {
+                    key: round(v, 4) if isinstance(v, float) else v
+                    for key, v in total.items()
+                }
+                for name, total in self.totals.items()
+            },
+        }
+
+    def merge_totals(self, totals):
+        for name, other in totals.items():
+            total = self.totals.setdefault(
+                name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows": 0}
+            )
+            for key, value in other.items():
+                total[key] += value
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+profiler = Profiler(os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0])
+span = profiler.span
+
+
+# ------------------------
+# Pipeline Report
+# ------------------------
+# Merges per-stage reports into one trace, one trace process per stage with
+# its events shifted to when the runner started it. `runs` holds
+# (stage, start offset in seconds, runner wall time, stage report).
+def combine_reports(runs, path):
+    trace, stages = [], {}
+    for pid, (stage, offset, wall, report) in enumerate(runs, start=1):
+        trace.append(
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": stage}}
+        )
+        trace.append(
+            {
+                "name": stage,
+                "ph": "X",
+                "pid": pid,
+                "tid": 0,
+                "ts": round(offset * 1e6),
+                "dur": round(wall * 1e6),
+            }
+        )
+        for event in report.get("traceEvents", []):
+            trace.append({**event, "pid": pid, "ts": event["ts"] + round(offset * 1e6)})
+        # wall_s is the runner's time for the whole process (interpreter start
+        # and imports included); script_wall_s is the time after profiling
+        # was imported.
+        stages[stage] = {
+            **{k: v for k, v in report.items() if k not in ("traceEvents", "stage")},
+            "wall_s": round(wall, 4),
+        }
+        if "wall_s" in report:
+            stages[stage]["script_wall_s"] = report["wall_s"]
+    with open(path, "w") as f:
+        json.dump({"traceEvents": trace, "stages": stages}, f, indent=2)
+
+
+# Runs fn in a pool worker and returns its aggregate totals with the result,
+# so run_sharded can fold per-series timings back into the parent report.
+def profiled_call(fn, *args):
+    profiler.totals = {}
+    return fn(*args), profiler.totals
+
+
+def _write_report():
+    path = os.environ.get(PROFILE_ENV)
+    if path and multiprocessing.parent_process() is None:  # not pool workers
+        profiler.write(path)
+
+
+atexit.register(_write_report)
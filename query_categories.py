@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from data_store import CACHE_DIR
+from text_match import FirstMatchAutomaton
+
+# -----------------------------------
+# Categorization Keywords
+# -----------------------------------
+CATEGORY_KEYWORDS = {
+    "fashion": [
+        "dress",
+        "tank",
+        "top",
+        "shirt",
+        "tshirt",
+        "trench",
+        "coat",
+        "blazer",
+        "jacket",
+        "sweater",
+        "hoodie",
+        "jeans",
+        "denim",
+        "shorts",
+        "skirt",
+        "trousers",
+        "pants",
+        "cargo",
+        "joggers",
+        "legging",
+        "palazzo",
+        "jumpsuit",
+        "romper",
+        "bodysuit",
+        "co-ord",
+        "matching set",
+        "overalls",
+        "bra",
+        "sports bra",
+        "camisole",
+        "corset",
+        "bralette",
+        "kurta",
+        "saree",
+        "lehenga",
+        "salwar",
+        "kaftan",
+        "cape",
+        "shrug",
+    ],
+    "footwear": [
+        "boots",
+        "shoes",
+        "heels",
+        "flats",
+        "sneakers",
+        "sandals",
+        "loafers",
+        "flipflops",
+        "mules",
+        "slippers",
+    ],
+    "accessories": [
+        "necklace",
+        "ring",
+        "earrings",
+        "bracelet",
+        "watch",
+        "belt",
+        "cap",
+        "hat",
+        "sunglasses",
+        "goggles",
+        "scarf",
+        "beanie",
+        "bag",
+        "purse",
+        "wallet",
+        "backpack",
+        "handbag",
+    ],
+    "electronics": [
+        "phone",
+        "charger",
+        "laptop",
+        "usb",
+        "adapter",
+        "tablet",
+        "monitor",
+        "keyboard",
+        "mouse",
+        "earphones",
+        "headphones",
+        "airpods",
+        "earbuds",
+        "speaker",
+        "smartwatch",
+    ],
+    "home": [
+        "curtain",
+        "lamp",
+        "sofa",
+        "blanket",
+        "pillow",
+        "rug",
+        "mattress",
+        "towel",
+        "cushion",
+        "bedsheet",
+        "duvet",
+        "comforter",
+        "quilt",
+        "vase",
+        "mirror",
+    ],
+}
+
+
+# -----------------------------------
+# Query Normalization
+# -----------------------------------
+# Bump when the cleaning rules change so memoized results are not reused.
+NORMALIZER_VERSION = "lower-strip-punct-1"
+MEMO_PATH = os.path.join(CACHE_DIR, "query_memo.pkl")
+
+
+def clean_query(text):
+    text = str(text).lower()
+    text = re.sub(r"[^\w\s]", "", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
+# clean_query for a whole column: each distinct raw query is cleaned once,
+# with the same steps run column-wide (object dtype keeps Python `re`
+# semantics), and results are memoized in an LRU table that can be saved
+# under CACHE_DIR and reloaded by the next run. Cost scales with the number
+# of distinct queries not seen before, not with rows.
+class QueryNormalizer:
+    def __init__(self, max_entries=1_000_000, path=MEMO_PATH):
+        self.max_entries = max_entries
+        self.path = path
+        self.memo = None
+        self.dirty = False
+
+    def _load(self):
+        self.memo = OrderedDict()
+        if self.path and os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                cached = pickle.load(f)
+            if cached["version"] == NORMALIZER_VERSION:
+                self.memo = cached["memo"]
+
+    def __call__(self, queries):
+        if self.memo is None:
+            self._load()
+        queries = pd.Series(queries)
+        codes, uniques = pd.factorize(queries, sort=False)
+        uniques = pd.Series([str(text) for text in uniques], dtype=object)
+
+        # Probe the memo per distinct query; mapping through the dict would
+        # copy the whole memo into a Series on every call.
+        cleaned = pd.Series([self.memo.get(text) for text in uniques], dtype=object)
+        missing = cleaned.isna().to_numpy()
+        for text in uniques[~missing]:
+            self.memo.move_to_end(text)
+        if missing.any():
+            fresh = (
+                uniques[missing]
+                .str.lower()
+                .str.replace(r"[^\w\s]", "", regex=True)
+                .str.replace(r"\s+", " ", regex=True)
+                .str.strip()
+            )
+            cleaned[missing] = fresh
+            self.memo.update(zip(uniques[missing], fresh))
+            while len(self.memo) > self.max_entries:
+                self.memo.popitem(last=False)
+            self.dirty = True
+
+        # Missing values are cleaned one by one (str(None) != str(nan)).
+        result = np.append(cleaned.to_numpy(dtype=object), None)[codes]
+        missing_rows = codes < 0
+        if missing_rows.any():
+            result[missing_rows] = [clean_query(v) for v in queries[missing_rows]]
+        return pd.Series(result, index=queries.index, dtype=object)
+
+    def save(self):
+        if not (self.dirty and self.path):
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {"version": NORMALIZER_VERSION, "memo": self.memo},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+clean_queries = QueryNormalizer()
+
+
+# -----------------------------------
+# Compiled Categorizer
+# -----------------------------------
+# All keywords are compiled into one automaton in table order, so the lowest
+# matching keyword index belongs to the first category (in dict order) with
+# any keyword contained in the query -- the same rule as looping over the
+# categories with `any(word in query ...)`. The compiled automaton is pickled
+# under CACHE_DIR keyed by a hash of the table and reused across runs.
+@lru_cache(maxsize=None)
+def compiled_categorizer(table_json):
+    digest = hashlib.sha1(table_json.encode()).hexdigest()[:16]
+    cache_path = os.path.join(CACHE_DIR, f"categorizer-{digest}.pkl")
+
+    if os.path.exists(cache_path):
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+
+    table = json.loads(table_json)
+    labels = [category for category, words in table.items() for _ in words]
+    patterns = [word for words in table.values() for word in words]
+    compiled = (FirstMatchAutomaton(patterns), labels)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"  # safe across concurrent stages
+    with open(tmp_path, "wb") as f:
+        pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+    return compiled
+
+
+# Category for every query in a Series; each distinct query is scanned once.
+def categorize_queries(queries, category_keywords=None):
+    automaton, labels = compiled_categorizer(
+        json.dumps(category_keywords or CATEGORY_KEYWORDS)
+    )
+    codes, uniques = pd.factorize(pd.Series(queries).astype(str), sort=False)
+    categories = np.array(
+        [
+            labels[index] if index >= 0 else "misc"
+            for index in map(automaton.search, uniques)
+        ],
+        dtype=object,
+    )
+    return pd.Series(categories[codes], index=getattr(queries, "index", None))
@@ -0,0 +1,115 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from data_store import iter_table
+
+LABEL_SCORES = {"positive": 1, "neutral": 0.5, "negative": 0}
+LABELS = list(LABEL_SCORES)
+HALF_LIFE_DAYS = 90
+# Recency weights are 2 ** ((t - anchor) / half_life). A weighted mean does not
+# depend on the anchor, so a fixed one keeps partial sums mergeable across
+# chunks without knowing the latest review date up front.
+RECENCY_ANCHOR = pd.Timestamp("2025-01-01")
+
+SUMMARY_COLUMNS = (
+    ["productId", "review_count"]
+    + [f"{label}_count" for label in LABELS]
+    + [
+        "sentiment_score",
+        "recency_weighted_score",
+        "mean_vader",
+        "mean_textblob",
+        "final_sentiment",
+    ]
+)
+
+
+# -------------------------------
+# Per-product Sentiment Summary
+# -------------------------------
+# Partial sums are computed per chunk with one groupby and merged by adding
+# them up, so the summary can be built while streaming reviews.
+def partial_summary(df, half_life_days=HALF_LIFE_DAYS):
+    score = df["final_sentiment"].map(LABEL_SCORES)
+    labeled = score.notna().astype(int)
+    if "timestamp" in df.columns:
+        age = (pd.to_datetime(df["timestamp"]) - RECENCY_ANCHOR).dt.days
+        weight = np.exp2(age.to_numpy(dtype=float) / half_life_days)
+        weight = np.where(np.isnan(weight), 0.0, weight) * labeled
+    else:
+        weight = labeled.to_numpy(dtype=float)
+
+    parts = pd.DataFrame(
+        {
+            "productId": df["productId"],
+            "review_count": 1,
+            "labeled_count": labeled,
+            "score_sum": score.fillna(0),
+            "weight_sum": weight,
+            "weighted_score_sum": weight * score.fillna(0),
+            "vader_sum": df["sentiment_vader"],
+            "textblob_sum": df["sentiment_textblob"],
+        }
+    )
+    for label in LABELS:
+        parts[f"{label}_count"] = (df["final_sentiment"] == label).astype(int)
+    return parts.groupby("productId").sum()
+
+
+def combine_partials(partials):
+    partials = [part for part in partials if not part.empty]
+    if not partials:
+        return pd.DataFrame()
+    return pd.concat(partials).groupby(level=0).sum()
+
+
+def finalize_summary(totals):
+    if totals.empty:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    counts = [f"{label}_count" for label in LABELS]
+    summary = totals[["review_count"] + counts].copy()
+    summary["sentiment_score"] = totals["score_sum"] / totals["labeled_count"].where(
+        totals["labeled_count"] > 0
+    )
+    summary["recency_weighted_score"] = totals["weighted_score_sum"] / totals[
+        "weight_sum"
+    ].where(totals["weight_sum"] > 0)
+    summary["mean_vader"] = totals["vader_sum"] / totals["review_count"]
+    summary["mean_textblob"] = totals["textblob_sum"] / totals["review_count"]
+    # Most frequent label; ties go to the earlier label in LABELS
+    summary["final_sentiment"] = np.where(
+        totals[counts].sum(axis=1) > 0,
+        np.array(LABELS, dtype=object)[np.argmax(totals[counts].to_numpy(), axis=1)],
+        None,
+    )
+    return summary.rename_axis("productId").reset_index()[SUMMARY_COLUMNS]
+
+
+# Aggregation stage over an already enriched review file, read in chunks.
+def summarize_enriched(path, chunksize=1_000_000, half_life_days=HALF_LIFE_DAYS):
+    totals = pd.DataFrame()
+    for chunk in iter_table(path, chunksize=chunksize):
+        totals = combine_partials([totals, partial_summary(chunk, half_life_days)])
+    return finalize_summary(totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Aggregate enriched reviews into per-product sentiment"
+    )
+    parser.add_argument(
+        "--enriched", default="customer_feedback_sentiment_enriched.csv"
+    )
+    parser.add_argument("--output", default="product_sentiment_summary.csv")
+    parser.add_argument("--half-life-days", type=float, default=HALF_LIFE_DAYS)
+    args = parser.parse_args()
+
+    summary = summarize_enriched(args.enriched, half_life_days=args.half_life_days)
+    summary.to_csv(args.output, index=False)
+    print(f"✅ Saved: {args.output} ({len(summary)} products)")
+
+
+if __name__ == "__main__":
+    main()
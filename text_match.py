@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import ahocorasick  # optional C automaton (pyahocorasick)
+except ImportError:
+    ahocorasick = None
+
+
+# ------------------------
+# Multi-pattern Substring Matcher
+# ------------------------
+# Aho-Corasick automaton over a list of patterns. search(text) returns the
+# lowest pattern index contained in the text (or -1), i.e. the same answer as
+# looping over the patterns in order and stopping at the first `p in text`,
+# but in one pass over the text regardless of the number of patterns.
+# pyahocorasick is used when installed; the pure-Python automaton keeps
+# transitions in one flat dict so large pattern sets stay compact.
+class FirstMatchAutomaton:
+    def __init__(self, patterns):
+        self.empty = -1  # the empty string is contained in every text
+        first_index = {}
+        for index, pattern in enumerate(patterns):
+            if pattern == "":
+                if self.empty < 0:
+                    self.empty = index
+            elif pattern not in first_index:
+                first_index[pattern] = index
+
+        if ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            for pattern, index in first_index.items():
+                self.automaton.add_word(pattern, index)
+            if first_index:
+                self.automaton.make_automaton()
+            else:
+                self.automaton = None
+        else:
+            self.automaton = None
+            self._build(first_index)
+
+    def _build(self, first_index):
+        self.goto = {}  # (node, char) -> node
+        best = [-1]  # lowest pattern index ending at (or suffix-linked from) node
+        for pattern, index in first_index.items():
+            node = 0
+            for char in pattern:
+                child = self.goto.get((node, char))
+                if child is None:
+                    child = len(best)
+                    self.goto[(node, char)] = child
+                    best.append(-1)
+                node = child
+            best[node] = index
+
+        # Breadth-first failure links; fold each node's best with its
+        # failure target so a single lookup covers every suffix match.
+        children = {}
+        for (node, char), child in self.goto.items():
+            children.setdefault(node, []).append((char, child))
+        self.fail = [0] * len(best)
+        queue = [child for _, child in children.get(0, [])]
+        for node in queue:
+            for char, child in children.get(node, []):
+                fallback = self.fail[node]
+                while fallback and (fallback, char) not in self.goto:
+                    fallback = self.fail[fallback]
+                target = self.goto.get((fallback, char), 0)
+                self.fail[child] = target if target != child else 0
+                linked = best[self.fail[child]]
+                if linked >= 0 and (best[child] < 0 or linked < best[child]):
+                    best[child] = linked
+                queue.append(child)
+        self.best = best
+
+    def search(self, text):
+        found = self.empty
+        if self.automaton is not None:
+            for _, index in self.automaton.iter(text):
+                if found < 0 or index < found:
+                    found = index
+            return found
+        if not getattr(self, "goto", None):
+            return found
+
+        goto, fail, best = self.goto, self.fail, self.best
+        node = 0
+        for char in text:
+            while node and (node, char) not in goto:
+                node = fail[node]
+            node = goto.get((node, char), 0)
+            index = best[node]
+            if index >= 0 and (found < 0 or index < found):
+                found = index
+        return found
+
+
+# Index of the first matching pattern for every text (-1 when none match),
+# scanning each distinct text once.
+def first_match_index(texts, patterns):
+    automaton = FirstMatchAutomaton(list(patterns))
+    codes, uniques = pd.factorize(pd.Series(texts).astype(str), sort=False)
+    matches = np.array([automaton.search(text) for text in uniques], dtype=np.int64)
+    return matches[codes]
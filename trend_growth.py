@@ -0,0 +1,282 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_store import load_table
+from query_categories import clean_queries
+
+CUBE_NAME = "search_trends_cube.npz"
+
+
+# Cleans queries and collapses raw log rows to one row per (query, day) with
+# the summed frequency and the earliest timestamp of that day.
+def aggregate_log(df):
+    timestamp = pd.to_datetime(df["timestamp"])
+    return (
+        pd.DataFrame(
+            {
+                "query": clean_queries(df["query"]),
+                "day": timestamp.dt.normalize(),
+                "frequency": df["frequency"].astype(np.int64),
+                "first_seen": timestamp,
+            }
+        )
+        .groupby(["query", "day"], sort=True)
+        .agg(frequency=("frequency", "sum"), first_seen=("first_seen", "min"))
+        .reset_index()
+    )
+
+
+# -----------------------------------
+# Daily Query Frequency Cube
+# -----------------------------------
+# Query id x day totals stored day by day (then by query id), so new days are
+# appended at the end. Query strings are held once in a dictionary in
+# first-seen order, with `order` listing the ids in sorted query order. Each
+# row carries its query's running frequency total up to that day, so a
+# query's total over a period is its last running total in the period minus
+# the one before it; a period is one searchsorted slice of the day column and
+# costs no pass over the rest of the history. Periods are inclusive whole days.
+class QueryFrequencyIndex:
+    def __init__(
+        self, queries, code, day, frequency, first_seen, order, cumulative, running
+    ):
+        self.queries = np.asarray(queries, dtype=object)  # index = code
+        self.code = np.asarray(code, dtype=np.int32)
+        self.day = np.asarray(day, dtype="datetime64[D]")
+        self.frequency = np.asarray(frequency, dtype=np.int32)
+        self.first_seen = np.asarray(first_seen, dtype="datetime64[ns]")
+        self.order = np.asarray(order, dtype=np.int64)
+        self.cumulative = np.asarray(cumulative, dtype=np.int64)
+        self.running = np.asarray(running, dtype=np.int64)  # per query, to date
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [], [], [], [], [])
+
+    # Drops the rows from `day` on, winding the running totals back to the
+    # start of each query's earliest dropped row.
+    def truncate(self, day):
+        cut = np.searchsorted(self.day, day_of(day), side="left")
+        codes, rows = first_rows(self.code[cut:])
+        rows += cut
+        running = self.running.copy()
+        running[codes] = self.cumulative[rows] - self.frequency[rows]
+        return QueryFrequencyIndex(
+            self.queries,
+            self.code[:cut],
+            self.day[:cut],
+            self.frequency[:cut],
+            self.first_seen[:cut],
+            self.order,
+            self.cumulative[:cut],
+            running,
+        )
+
+    # Appends aggregate_log rows for days after the last one held. Unseen
+    # queries get the next ids and are merged into `order`; running totals
+    # continue from each query's total to date.
+    def append(self, daily):
+        queries = daily["query"].to_numpy(dtype=object)
+        code = pd.Index(self.queries).get_indexer(queries)
+        added = np.sort(pd.unique(queries[code < 0]))
+        added_code = np.arange(len(added)) + len(self.queries)
+        code[code < 0] = added_code[np.searchsorted(added, queries[code < 0])]
+        position = np.searchsorted(self.queries[self.order], added)
+
+        day = daily["day"].to_numpy().astype("datetime64[D]")
+        rows = np.lexsort((code, day))
+        code, frequency = code[rows], daily["frequency"].to_numpy()[rows]
+        running = np.concatenate([self.running, np.zeros(len(added), np.int64)])
+        cumulative, running = running_totals(code, frequency, running)
+        return QueryFrequencyIndex(
+            np.concatenate([self.queries, added]),
+            np.concatenate([self.code, code]),
+            np.concatenate([self.day, day[rows]]),
+            np.concatenate([self.frequency, frequency]),
+            np.concatenate([self.first_seen, daily["first_seen"].to_numpy()[rows]]),
+            np.insert(self.order, position, added_code),
+            np.concatenate([self.cumulative, cumulative]),
+            running,
+        )
+
+    # Per-query frequency total, whether the query has any row in the period,
+    # and its earliest timestamp there (NaT when absent).
+    def totals(self, start, end):
+        lo = np.searchsorted(self.day, day_of(start), side="left")
+        hi = max(np.searchsorted(self.day, day_of(end), side="right"), lo)
+        codes, first = first_rows(self.code[lo:hi])
+        _, last = last_rows(self.code[lo:hi])
+        first, last = first + lo, last + lo
+
+        frequency = np.zeros(len(self.queries), dtype=np.int64)
+        frequency[codes] = (
+            self.cumulative[last] - self.cumulative[first] + self.frequency[first]
+        )
+        present = np.zeros(len(self.queries), dtype=bool)
+        present[codes] = True
+        first_seen = np.full(
+            len(self.queries), np.datetime64("NaT"), dtype="datetime64[ns]"
+        )
+        first_seen[codes] = self.first_seen[first]
+        return frequency, present, first_seen
+
+
+def day_of(value):
+    return pd.Timestamp(value).to_datetime64().astype("datetime64[D]")
+
+
+# Distinct codes (ascending) and the row of each one's first / last occurrence.
+def first_rows(code):
+    return np.unique(code, return_index=True)
+
+
+def last_rows(code):
+    codes, rows = np.unique(code[::-1], return_index=True)
+    return codes, len(code) - 1 - rows
+
+
+# Running total of each row's query, continuing from the per-query totals in
+# `running`; returns the row totals and the per-query totals after them.
+def running_totals(code, frequency, running):
+    cumulative = running[code] + (
+        pd.Series(frequency, dtype=np.int64).groupby(code).cumsum().to_numpy()
+    )
+    codes, last = last_rows(code)
+    running = running.copy()
+    running[codes] = cumulative[last]
+    return cumulative, running
+
+
+# -----------------------------------
+# Persisted Cube
+# -----------------------------------
+# `search_trends_cube.npz` next to the log holds the cube arrays. Each update
+# re-reads only the raw rows from the last ingested day on (so rows appended
+# for the latest day are folded in), drops that day from the cube and appends
+# the new days; logs backfilled for older days need --rebuild. A cube saved
+# in the earlier query-major layout (no `order` array) is rebuilt.
+CUBE_ARRAYS = ["code", "day", "frequency", "first_seen", "order", "cumulative"]
+
+
+def save_cube(path, index):
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # search_trend and Growth Rate may race
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            queries=index.queries.astype(str),
+            running=index.running,
+            **{name: getattr(index, name) for name in CUBE_ARRAYS},
+        )
+    os.replace(tmp_path, path)
+
+
+def load_cube(path):
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as arrays:
+        if "order" not in arrays:
+            return None
+        return QueryFrequencyIndex(
+            arrays["queries"],
+            *(arrays[name] for name in CUBE_ARRAYS),
+            arrays["running"],
+        )
+
+
+def update_cube(data_dir=".", rebuild=False):
+    path = os.path.join(data_dir, CUBE_NAME)
+    cube = None if rebuild else load_cube(path)
+    if cube is None:
+        cube = QueryFrequencyIndex.empty()
+    reload_from = cube.day[-1] if len(cube.day) else None
+
+    new = load_table(
+        "search_trends",
+        columns=["query", "timestamp", "frequency"],
+        start=reload_from,
+        data_dir=data_dir,
+    )
+    if reload_from is not None:
+        cube = cube.truncate(reload_from)
+    index = cube.append(aggregate_log(new))
+    save_cube(path, index)
+    clean_queries.save()
+    return index
+
+
+# -----------------------------------
+# Comparison Windows
+# -----------------------------------
+# Current and previous (start, end) days for a named window ending at as_of:
+# wow compares the last 7 days with the 7 before, mom the calendar month of
+# as_of with the month before, yoy that month with the same month a year
+# earlier.
+def comparison_window(window, as_of):
+    as_of = pd.Timestamp(as_of).normalize()
+    if window == "wow":
+        return (
+            (as_of - pd.Timedelta(days=6), as_of),
+            (as_of - pd.Timedelta(days=13), as_of - pd.Timedelta(days=7)),
+        )
+    month = as_of.to_period("M")
+    previous = {"mom": month - 1, "yoy": month - 12}[window]
+    return (
+        (month.start_time, month.end_time.normalize()),
+        (previous.start_time, previous.end_time.normalize()),
+    )
+
+
+# -----------------------------------
+# Growth Tables
+# -----------------------------------
+# how="current" keeps queries seen in the current period (search_trend.py),
+# how="outer" keeps queries seen in either period (Growth Rate.py).
+def growth_frame(index, current, previous, how="current", scale=1):
+    cur, cur_present, cur_first = index.totals(*current)
+    prev, prev_present, prev_first = index.totals(*previous)
+    keep = cur_present if how == "current" else cur_present | prev_present
+    keep = index.order[keep[index.order]]  # in sorted query order
+    if how == "outer":
+        # An outer merge of the two period tables leaves NaN (then 0) for
+        # queries missing on one side, which turns that column into floats.
+        if not cur_present[keep].all():
+            cur = cur.astype(float)
+        if not prev_present[keep].all():
+            prev = prev.astype(float)
+
+    frame = pd.DataFrame(
+        {
+            "query": index.queries[keep],
+            "frequency_current": cur[keep],
+            "timestamp_current": cur_first[keep],
+            "frequency_previous": prev[keep],
+            "timestamp_previous": prev_first[keep],
+        }
+    )
+    frame["growthRate"] = (
+        (frame["frequency_current"] - frame["frequency_previous"])
+        / (frame["frequency_previous"] + 1)
+    ) * scale
+    frame["growthRate"] = frame["growthRate"].round(2)
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build or update the daily query-frequency cube"
+    )
+    parser.add_argument("--data-dir", default=".")
+    parser.add_argument(
+        "--rebuild", action="store_true", help="re-aggregate the whole search log"
+    )
+    args = parser.parse_args()
+
+    index = update_cube(args.data_dir, args.rebuild)
+    print(f"✅ {CUBE_NAME}: {len(index.queries)} queries, {len(index.day)} query-days")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from data_store import CSV_CHUNKSIZE, iter_table
+from query_categories import clean_queries
+
+HASH_KEYS = ("trendsketchkey01", "trendsketchkey02")
+
+
+# -----------------------------------
+# Count-Min Sketch
+# -----------------------------------
+# depth x width counters; an estimate never undercounts and overcounts by at
+# most epsilon * (total frequency added) with probability 1 - delta. Rows
+# are indexed by double hashing of two 64-bit pandas string hashes, so a
+# whole chunk of queries is hashed and added without a Python loop.
+class CountMinSketch:
+    def __init__(self, epsilon=1e-4, delta=0.01):
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.total = 0
+
+    def _columns(self, queries):
+        values = np.asarray(queries, dtype=object)
+        h1, h2 = (pd.util.hash_array(values, hash_key=key) for key in HASH_KEYS)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1 + rows * (h2 | np.uint64(1))) % np.uint64(self.width)).astype(
+            np.int64
+        )
+
+    def add(self, queries, counts):
+        counts = np.asarray(counts, dtype=np.int64)
+        for row, columns in enumerate(self._columns(queries)):
+            np.add.at(self.table[row], columns, counts)
+        self.total += int(counts.sum())
+
+    def estimate(self, queries):
+        if len(queries) == 0:
+            return np.zeros(0, dtype=np.int64)
+        columns = self._columns(queries)
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+
+# -----------------------------------
+# Space-Saving Heavy Hitters
+# -----------------------------------
+# At most `capacity` monitored queries with an overestimated count and its
+# maximum error (count - error <= true count <= count). Updates take a
+# pre-aggregated chunk: queries already monitored add their counts, new ones
+# enter at count + current minimum (the classic replacement rule), and only
+# the `capacity` largest counts are kept. Any query whose true count exceeds
+# total / capacity is guaranteed to be monitored.
+class SpaceSaving:
+    def __init__(self, capacity=10_000):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.int64)
+        self.errors = pd.Series(dtype=np.int64)
+
+    def update(self, counts):
+        floor = int(self.counts.min()) if len(self.counts) >= self.capacity else 0
+        new = counts[~counts.index.isin(self.counts.index)]
+        merged = self.counts.add(counts, fill_value=0).astype(np.int64)
+        merged[new.index] += floor
+        errors = self.errors.reindex(merged.index, fill_value=0).astype(np.int64)
+        errors[new.index] = floor
+
+        keep = merged.nlargest(self.capacity, keep="first").index
+        self.counts = merged[keep]
+        self.errors = errors[keep]
+
+
+class PeriodSketch:
+    def __init__(self, capacity, epsilon, delta):
+        self.heavy = SpaceSaving(capacity)
+        self.sketch = CountMinSketch(epsilon, delta)
+
+    def add(self, counts):
+        self.heavy.update(counts)
+        self.sketch.add(counts.index, counts.to_numpy())
+
+
+# -----------------------------------
+# Streaming Top-K Growth
+# -----------------------------------
+# One bounded-memory pass over the search log for any number of
+# (current, previous) period pairs. Candidates are the heavy hitters of the
+# current period; their frequencies in both periods are sketch estimates,
+# which can only overcount (the returned bounds say by how much). A term must
+# be among the `capacity` most frequent current queries to be ranked.
+def streaming_top_growth(
+    comparisons,
+    top_n=10,
+    capacity=10_000,
+    epsilon=1e-4,
+    delta=0.01,
+    chunksize=CSV_CHUNKSIZE,
+    data_dir=".",
+):
+    periods = {
+        (pd.Timestamp(start), pd.Timestamp(end))
+        for pair in comparisons.values()
+        for start, end in pair
+    }
+    sketches = {period: PeriodSketch(capacity, epsilon, delta) for period in periods}
+
+    for chunk in iter_table(
+        "search_trends",
+        columns=["query", "timestamp", "frequency"],
+        chunksize=chunksize,
+        data_dir=data_dir,
+    ):
+        timestamp = pd.to_datetime(chunk["timestamp"]).dt.normalize()
+        queries = None
+        for (start, end), sketch in sketches.items():
+            mask = ((timestamp >= start) & (timestamp <= end)).to_numpy()
+            if not mask.any():
+                continue
+            if queries is None:  # clean each chunk at most once
+                queries = clean_queries(chunk["query"]).to_numpy(dtype=object)
+            counts = (
+                pd.Series(chunk["frequency"].to_numpy(dtype=np.int64)[mask])
+                .groupby(queries[mask], sort=False)
+                .sum()
+            )
+            sketch.add(counts)
+    clean_queries.save()
+
+    results = {}
+    for name, (current, previous) in comparisons.items():
+        current = sketches[tuple(pd.Timestamp(day) for day in current)]
+        previous = sketches[tuple(pd.Timestamp(day) for day in previous)]
+        candidates = current.heavy.counts.index
+        # Both summaries only overcount; the tighter of the two is kept.
+        cur = np.minimum(
+            current.heavy.counts.to_numpy(), current.sketch.estimate(candidates)
+        )
+        prev = previous.sketch.estimate(candidates)
+        growth = pd.DataFrame(
+            {
+                "searchTerm": candidates.astype(object),
+                "growthRate": (((cur - prev) / (prev + 1)) * 100).round(2),
+            }
+        )
+        results[name] = (
+            growth.sort_values(by="growthRate", ascending=False)
+            .head(top_n)
+            .reset_index(drop=True),
+            {
+                "current_error": math.ceil(epsilon * current.sketch.total),
+                "previous_error": math.ceil(epsilon * previous.sketch.total),
+            },
+        )
+    return results